@@ -10,6 +10,11 @@ class BaseRuleset(ABC):
     并实现`translate`翻译函数，接受id，中文原文，英文原文，返回生成的内容
     """
     
+    # 为真时规则集不声明ID，而是在所有ID规则集之后对每一条输出文本调用`rewrite`
+    rewrites_text = False
+    # 输出还依赖的其他模块(定义规则集的模块之外)，这些模块的代码变化时增量构建的缓存失效
+    VERSION_MODULES: tuple[str, ...] = ()
+    
     def __init__(self) -> None: 
         self.id_set = set()
         
@@ -19,6 +24,37 @@ class BaseRuleset(ABC):
     def get_ids(self) -> set[str]:
         return self.id_set
     
+    def get_sources(self) -> list[str]:
+        """
+        规则集读取的数据文件或目录，常驻模式下这些路径变化时重新创建规则集(参见 watch.py)
+        """
+        return []
+    
+    def bind(self, store) -> None:
+        """
+        在获取ID之前调用，`store`为全部文本(TextStore)
+        需要根据全部ID/文本确定`id_set`的规则集可以在这里处理
+        """
+        pass
+    
+    def fingerprint(self, tid: str|tuple) -> str|None:
+        """
+        返回该ID的翻译所依赖的规则集数据，用于增量构建(参见 BuildManifest)
+        返回None表示不缓存，每次都重新调用`translate`
+        """
+        return None
+    
+    def version_inputs(self) -> Any:
+        """
+        影响该规则集所有输出的配置，变化时增量构建的缓存全部失效(参见 build_manifest.ruleset_version)
+        默认为实例上的标量属性(如数据目录、开关)，数据文件的内容另外按`get_sources`计算
+        """
+        return sorted((key, value) for key, value in vars(self).items() if value is None or isinstance(value, (str, int, float, bool)))
+    
+    def rewrite(self, text: str) -> str:
+        """改写一条输出文本(不含ID)，只有`rewrites_text`为真的规则集会被调用"""
+        return text
+    
     @abstractmethod
     def translate(self, tid: str|tuple, cn_str: str|None, en_str: str|None) -> str:
         pass
@@ -0,0 +1,96 @@
+import os, time, hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Callable, Type
+
+import config
+from base_ruleset import BaseRuleset
+from generation_manager import GenerationManager, prefetch_apis, instantiate_ruleset
+from output_writer import OutputVariant
+
+def create_shared_rulesets(rulesets: list[Type[BaseRuleset]], text_dirs: list[str]) -> list[BaseRuleset]:
+    """
+    抓取API并创建规则集，所有版本共用
+    抓取到的数据在主进程中写入物品库中每个版本，子进程不访问物品库
+    """
+    api_data = prefetch_apis(rulesets, text_dirs[0]) if len(text_dirs) else prefetch_apis(rulesets)
+    if len(api_data) and len(text_dirs) > 1:
+        from item_store import ingest_apis, item_version
+        for text_dir in text_dirs[1:]:
+            ingest_apis(api_data, item_version(text_dir))
+    with ThreadPoolExecutor(max_workers=max(1, min(config.RULESET_WORKERS, len(rulesets)))) as executor:
+        return list(executor.map(lambda ruleset_cls: instantiate_ruleset(ruleset_cls, api_data), rulesets))
+
+def version_cache_dir(text_dir: str) -> str:
+    path = os.path.abspath(text_dir)
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(config.BATCH_CACHE_DIR, f"{os.path.basename(path)}_{digest}")
+
+def build_version(
+    text_dir: str,
+    rulesets: list[BaseRuleset],
+    create_variants: Callable[[GenerationManager, str], list[OutputVariant]]
+) -> dict:
+    """构建一个版本，在子进程中运行，`rulesets`为已创建好的规则集实例"""
+    start = time.perf_counter()
+    maker = GenerationManager(
+        os.path.join(text_dir, 'en.ini'),
+        os.path.join(text_dir, 'cn.ini'),
+        os.path.join(text_dir, 'ref.ini'),
+        cache_dir=version_cache_dir(text_dir)
+    )
+    # 各版本已经并行，版本内的翻译不再使用多进程
+    maker.apply_ruleset_instances(rulesets, executor='serial')
+    variants = create_variants(maker, text_dir)
+    maker.generate_variants(variants)
+    return {
+        'text_dir': text_dir,
+        'version': maker.get_text(config.VERSION_TEXT_ID),
+        'seconds': time.perf_counter() - start,
+        'outputs': [variant.output_path for variant in variants],
+    }
+
+def build_versions(
+    text_dirs: list[str],
+    rulesets: list[Type[BaseRuleset]],
+    create_variants: Callable[[GenerationManager, str], list[OutputVariant]],
+    max_workers: int = config.BATCH_WORKERS
+) -> list[dict]:
+    """
+    构建多个版本(每个目录包含en/cn/ref.ini)
+
+    cstone API只抓取一次，custom中的数据只读取一次，规则集实例传给各版本的子进程，
+    子进程只需要解析各自的文本文件、分配ID和生成输出
+    `create_variants(maker, text_dir)`返回该版本的输出文件，需要可以被pickle(模块级函数)
+    某个版本失败不影响其他版本，结果中记录错误
+    """
+    start = time.perf_counter()
+    logging.info(f"Creating rulesets {', '.join(cls.__name__ for cls in rulesets)}...")
+    instances = create_shared_rulesets(rulesets, text_dirs)
+    logging.info(f"Shared rulesets ready in {time.perf_counter() - start:.2f}s")
+    results = list()
+    if len(text_dirs) <= 1 or max_workers <= 1:
+        for text_dir in text_dirs:
+            try:
+                results.append(build_version(text_dir, instances, create_variants))
+            except Exception as e:
+                logging.exception(f"[BATCH_EXECPTION] {text_dir}: {e}")
+                results.append({'text_dir': text_dir, 'error': str(e)})
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(text_dirs))) as pool:
+            futures = {pool.submit(build_version, text_dir, instances, create_variants): text_dir for text_dir in text_dirs}
+            for future in as_completed(futures):
+                text_dir = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logging.exception(f"[BATCH_EXECPTION] {text_dir}: {e}")
+                    results.append({'text_dir': text_dir, 'error': str(e)})
+    results.sort(key=lambda result: text_dirs.index(result['text_dir']))
+    for result in results:
+        if 'error' in result:
+            logging.warning(f"[BATCH_FAILED] {result['text_dir']}: {result['error']}")
+        else:
+            logging.info(f"Built {result['text_dir']} in {result['seconds']:.2f}s")
+    logging.info(f"Built {len(text_dirs)} versions in {time.perf_counter() - start:.2f}s")
+    return results
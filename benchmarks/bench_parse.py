@@ -0,0 +1,92 @@
+"""
+ini解析的基准测试：比较旧的 read()+replace()+splitlines() 与流式解析
+
+在仓库根目录运行: python -m benchmarks.bench_parse [--lines 100000]
+每种方式在独立子进程中运行，分别统计峰值内存(RSS/tracemalloc)和解析耗时
+"""
+import os, sys, time, json
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import config
+from utils import iter_ini_items
+from benchmarks.synthetic import write_synthetic_ini
+
+def parse_legacy(path: str) -> dict:
+    data = dict()
+    with open(path, 'r', encoding=config.ENCODE, errors='replace') as file:
+        content = file.read().replace(config.UNKNOWN_CHR, config.REPLACE_CHR)
+        for line in content.splitlines():
+            tid, _, text = line.partition('=')
+            data[tid.removeprefix('\ufeff')] = text
+    return data
+
+def parse_stream(path: str) -> dict:
+    data = dict()
+    with open(path, 'r', encoding=config.ENCODE, errors='replace') as file:
+        for tid, text in iter_ini_items(file):
+            data[tid] = text
+    return data
+
+PARSERS = {
+    'legacy': parse_legacy,
+    'stream': parse_stream,
+}
+
+def peak_rss_kb() -> int|None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS返回字节，Linux返回KB
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def run_single(name: str, path: str) -> dict:
+    baseline_rss = peak_rss_kb()
+    start = time.perf_counter()
+    data = PARSERS[name](path)
+    elapsed = time.perf_counter() - start
+    rss = peak_rss_kb()
+    tracemalloc.start()
+    data = None
+    data = PARSERS[name](path)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'parser': name,
+        'items': len(data),
+        'seconds': elapsed,
+        'peak_rss_kb': rss,
+        'rss_growth_kb': rss - baseline_rss if rss is not None else None,
+        'traced_peak_kb': traced_peak // 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=100_000)
+    parser.add_argument('--single', choices=list(PARSERS.keys()), help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.file)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.ini')
+        write_synthetic_ini(path, args.lines)
+        print(f"{args.lines} lines, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        print(f"{'parser':<8} {'time(s)':>8} {'rss(KB)':>10} {'rss+(KB)':>10} {'traced(KB)':>11}")
+        for name in PARSERS:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_parse', '--single', name, '--file', path],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{name:<8} {result['seconds']:>8.3f} {str(result['peak_rss_kb']):>10} {str(result['rss_growth_kb']):>10} {result['traced_peak_kb']:>11}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+本地cstone API桩服务，返回录制好的JSON，可以设置延迟
+
+数据目录中的`<api>.json`对应`/<api>`，也可以用`--from-cache`直接使用cstone响应缓存
+在仓库根目录运行: python -m benchmarks.cstone_stub <数据目录> [--port 8765] [--latency 0.3]
+"""
+import os, json, time
+import argparse
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import config
+
+def load_recorded(data_dir: str) -> dict[str, bytes]:
+    payloads = dict()
+    for filename in os.listdir(data_dir):
+        if not filename.endswith('.json'): continue
+        with open(os.path.join(data_dir, filename), 'rb') as file:
+            payloads[filename.removesuffix('.json')] = file.read()
+    return payloads
+
+def load_from_cache(cache_dir: str = config.CSTONE_CACHE_DIR) -> dict[str, bytes]:
+    """从cstone_api的缓存目录读取录制的响应"""
+    with open(os.path.join(cache_dir, 'index.json'), 'r', encoding='utf-8') as file:
+        index = json.load(file)
+    payloads = dict()
+    for url, entry in index.items():
+        with open(os.path.join(cache_dir, 'objects', f"{entry['hash']}.json"), 'rb') as file:
+            payloads[url.rsplit('/', 1)[-1]] = file.read()
+    return payloads
+
+class CstoneStub():
+
+    """在后台线程中运行的桩服务，每个请求先等待`latency`秒"""
+
+    def __init__(self, payloads: dict[str, bytes], latency: float = 0.0, port: int = 0) -> None:
+        self.payloads = payloads
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.latency)
+                api = self.path.split('?', 1)[0].strip('/')
+                payload = stub.payloads.get(api)
+                if payload is None:
+                    self.send_error(404)
+                    return
+                etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> 'CstoneStub':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('data_dir', nargs='?')
+    parser.add_argument('--from-cache', action='store_true', help='使用cstone响应缓存作为数据')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    payloads = load_from_cache() if args.from_cache else load_recorded(args.data_dir)
+    with CstoneStub(payloads, args.latency, args.port) as stub:
+        print(f"Serving {', '.join(payloads)} at {stub.base_url}")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
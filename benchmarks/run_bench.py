@@ -0,0 +1,179 @@
+"""
+流水线基准测试
+
+对每个数据规模生成合成的en/cn/ref文件和cstone数据(由本地桩服务提供)，依次计时：
+- parse: 解析文本文件(不使用快照)
+- parse_snapshot: 从快照加载
+- apply_rulesets: 抓取cstone数据、创建规则集并生成翻译(另外记录每个规则集的耗时)
+- generate: 写出output.ini
+
+结果保存在`benchmarks/results/`，并与`benchmarks/baseline.json`比较，超出容差时返回1
+在仓库根目录运行: python -m benchmarks.run_bench [--sizes 10000 100000 1000000] [--save-baseline]
+"""
+import os, sys, json, time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+
+import config
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+def configure(work_dir: str, base_url: str) -> None:
+    """把缓存等路径指向临时目录，需要在导入流水线模块之前调用(参数默认值在导入时绑定)"""
+    config.CACHE_DIR = os.path.join(work_dir, 'cache')
+    config.SNAPSHOT_CACHE_DIR = os.path.join(config.CACHE_DIR, 'snapshot')
+    config.BUILD_MANIFEST_PATH = os.path.join(config.CACHE_DIR, 'build_manifest.bin')
+    config.RESOLVER_CACHE_PATH = os.path.join(config.CACHE_DIR, 'id_resolver.bin')
+    config.BUILD_REPORT_PATH = os.path.join(config.CACHE_DIR, 'build_report.json')
+    config.CSTONE_CACHE_DIR = os.path.join(config.CACHE_DIR, 'cstone')
+    config.ITEM_STORE_PATH = os.path.join(config.CACHE_DIR, 'items.sqlite')
+    config.CSTONE_CACHE_TTL = 0
+    config.CSTONE_OFFLINE = False
+    config.CSTONE_BASE_URL = base_url
+
+def peak_rss_kb() -> int|None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+class StageTimer():
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.stages: dict[str, dict] = dict()
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            result = {'seconds': time.perf_counter() - start}
+            if self.trace_memory:
+                result['peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+                tracemalloc.stop()
+            self.stages[name] = result
+
+def run_scenario(size: int, work_dir: str, stub, with_cstone: bool, trace_memory: bool) -> dict:
+    from benchmarks.synthetic import SyntheticDataset
+    from generation_manager import GenerationManager
+    from text_store import TextStore
+    from local_ruleset import GeneralReplaceRuleset, BombRuleset, LocationPatternRuleset
+
+    shutil.rmtree(config.CACHE_DIR, ignore_errors=True)
+    data_dir = os.path.join(work_dir, f"data_{size}")
+    dataset = SyntheticDataset(size)
+    paths = dataset.write_ini(data_dir)
+    rulesets = [GeneralReplaceRuleset, LocationPatternRuleset]
+    if with_cstone:
+        from cstone_ruleset import CstoneFoodAndDrink, CstoneMissile, CstoneShipParts
+        stub.payloads = {api: json.dumps(items).encode('utf-8') for api, items in dataset.items.items()}
+        rulesets += [CstoneFoodAndDrink, CstoneMissile, CstoneShipParts]
+    rulesets.append(BombRuleset)
+
+    timer = StageTimer(trace_memory)
+    with timer.stage('parse'):
+        maker = GenerationManager(paths['en'], paths['cn'], paths['ref'], use_snapshot=False, incremental=False)
+    TextStore.from_files(paths)
+    with timer.stage('parse_snapshot'):
+        TextStore.from_files(paths)
+    with timer.stage('apply_rulesets'):
+        maker.apply_rulesets(rulesets)
+    with timer.stage('generate'):
+        maker.generate(os.path.join(data_dir, 'output.ini'))
+    return {
+        'stages': timer.stages,
+        'rulesets': {
+            name: {'init_seconds': stats.init_seconds, 'process_seconds': stats.process_seconds, 'translated': stats.translated}
+            for name, stats in maker.stats.rulesets.items()
+        },
+    }
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """返回超出容差的阶段，绝对差值小于10ms的忽略"""
+    regressions = []
+    for size, scenario in result['scenarios'].items():
+        base_scenario = baseline.get('scenarios', {}).get(size)
+        if base_scenario is None: continue
+        for stage, stats in scenario['stages'].items():
+            base_stats = base_scenario['stages'].get(stage)
+            if base_stats is None: continue
+            now, before = stats['seconds'], base_stats['seconds']
+            flag = ''
+            if now > before * (1 + tolerance) and now - before > 0.01:
+                flag = ' REGRESSION'
+                regressions.append(f"{size}/{stage}")
+            print(f"  {size:>8} {stage:<16} {before:>8.3f}s -> {now:>8.3f}s ({now / before if before else 0:>5.2f}x){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--latency', type=float, default=0.2, help='桩服务每个请求的延迟(秒)')
+    parser.add_argument('--no-cstone', action='store_true', help='不运行cstone规则集')
+    parser.add_argument('--trace-memory', action='store_true', help='用tracemalloc统计每个阶段的峰值内存(会变慢)')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with_cstone = not args.no_cstone
+    if with_cstone:
+        try:
+            import requests
+        except ImportError:
+            print('requests is not installed, skipping cstone rulesets')
+            with_cstone = False
+
+    from benchmarks.cstone_stub import CstoneStub
+    with tempfile.TemporaryDirectory() as work_dir, CstoneStub(dict(), args.latency) as stub:
+        configure(work_dir, stub.base_url)
+        result = {
+            'meta': {'time': time.time(), 'python': sys.version, 'platform': platform.platform(), 'latency': args.latency, 'cstone': with_cstone},
+            'scenarios': dict(),
+        }
+        for size in args.sizes:
+            scenario = run_scenario(size, work_dir, stub, with_cstone, args.trace_memory)
+            result['scenarios'][str(size)] = scenario
+            print(f"[{size} lines]")
+            for stage, stats in scenario['stages'].items():
+                memory = f" peak {stats['peak_kb']} KB" if 'peak_kb' in stats else ''
+                print(f"  {stage:<16} {stats['seconds']:>8.3f}s{memory}")
+            for name, stats in scenario['rulesets'].items():
+                print(f"    {name:<24} init {stats['init_seconds']:>7.3f}s  process {stats['process_seconds']:>7.3f}s")
+        result['peak_rss_kb'] = peak_rss_kb()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S.json'))
+    with open(result_path, 'w', encoding='utf-8') as file:
+        json.dump(result, file, indent=2)
+    print(f"Peak RSS {result['peak_rss_kb']} KB, results saved to {result_path}")
+
+    if args.save_baseline:
+        shutil.copyfile(result_path, BASELINE_PATH)
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        print('Compared with baseline:')
+        regressions = compare(result, baseline, args.tolerance)
+        if len(regressions):
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+合成测试数据：类似global.ini的en/cn/ref文件，以及对应的cstone API数据
+
+在仓库根目录运行: python -m benchmarks.synthetic <输出目录> [--lines 100000]
+"""
+import os, json
+import random
+import argparse
+
+import config
+
+EN_WORDS = ['Quantum', 'Drive', 'Cooler', 'Shield', 'Missile', 'Cargo', 'Hauling', 'Bomb', 'Stanton', 'Lagrange',
+            'Power', 'Plant', 'Burger', 'Coffee', 'Station', 'Contract', 'Deliver', 'Security', 'Mining', 'Salvage']
+CN_WORDS = ['量子', '引擎', '冷却器', '护盾', '导弹', '货物', '运输', '炸弹', '斯坦顿', '拉格朗日',
+            '能源', '发电机', '汉堡', '咖啡', '空间站', '合同', '运送', '安保', '采矿', '打捞']
+MISSILE_TRACKING = ['Electromagnetic', 'CrossSection', 'Infrared']
+PART_TYPES = {'GetCoolers': ('COOL', 'Cooler'), 'GetPowers': ('POWR', 'PowerPlant'), 'GetDrives': ('QDRV', 'QuantumDrive'), 'GetShields': ('SHLD', 'Shield')}
+PART_CLASSES = ['Civilian', 'Competition', 'Industrial', 'Military', 'Stealth']
+FOOD_EFFECTS = ['Cognitive Boosting', 'Dehydrating', 'Energizing', 'Fatiguing', 'None']
+
+def _sentence(rnd: random.Random, words: list[str], count: int, sep: str) -> str:
+    return sep.join(rnd.choice(words) for _ in range(count))
+
+class SyntheticDataset():
+
+    """
+    按行数生成ID及en/cn/ref文本，约1%的ID是cstone物品，另有少量任务/拉格朗日点等规则集会处理的ID
+    `items`为每个cstone API的物品数据
+    """
+
+    def __init__(self, lines: int, seed: int = 0) -> None:
+        rnd = random.Random(seed)
+        self.ids: list[str] = list()
+        self.items: dict[str, list[dict]] = {api: [] for api in ['GetMissiles', 'GetFoods', 'GetDrinks', *PART_TYPES]}
+        item_count = max(lines // 100, 10)
+        for i in range(item_count):
+            api = rnd.choice(list(self.items.keys()))
+            code = self.__add_item(rnd, api, i)
+            self.ids.append(f"item_Name{code}")
+            self.ids.append(f"item_Desc{code}")
+        self.ids.append('_starcitizen_doctor_localization_version')
+        self.ids += ['item_NameBOMB_S03_FSKI_Thunderball', 'item_NameBOMB_S05_FSKI_Stormburst', 'item_NameBOMB_S10_FSKI_Colossus']
+        self.ids += [f"RR_{system}_L{n}" for system in ('HUR', 'CRU', 'ARC', 'MIC') for n in range(1, 6)]
+        self.ids += ['Covalex_HaulCargo_AToB_title', 'Covalex_HaulCargo_MultiToSingle_title']
+        prefixes = ['item_Desc', 'mobiGlas_ui_', 'Dialogue_', 'vehicle_Name', 'items_commodities_', 'location_', 'mission_']
+        i = 0
+        while len(self.ids) < lines:
+            self.ids.append(f"{rnd.choice(prefixes)}{i:07d}")
+            i += 1
+        self.ids = self.ids[:lines]
+        self.texts: dict[str, list[str]] = {'en': [], 'cn': [], 'ref': []}
+        for tid in self.ids:
+            count = rnd.randint(1, 16)
+            en = _sentence(rnd, EN_WORDS, count, ' ')
+            cn = _sentence(rnd, CN_WORDS, count, '')
+            if tid.startswith('Covalex'):
+                en += ' ~mission(ReputationRank) - ~mission(CargoGradeToken)'
+                cn += ' ~mission(ReputationRank) - ~mission(CargoGradeToken)'
+            self.texts['en'].append(en)
+            self.texts['cn'].append(cn)
+            self.texts['ref'].append(f"{cn} {en}")
+
+    def __add_item(self, rnd: random.Random, api: str, i: int) -> str:
+        if api == 'GetMissiles':
+            code = f"MISL_S{rnd.randint(1, 9):02d}_SYN_{i:05d}"
+            self.items[api].append({
+                'ItemCodeName': code,
+                'LinearSpeed': rnd.randint(100, 2000),
+                'Misdmg': rnd.randint(1000, 30000),
+                'Size': rnd.randint(1, 9),
+                'TrackingSignalType': rnd.choice(MISSILE_TRACKING),
+            })
+        elif api in ('GetFoods', 'GetDrinks'):
+            code = f"{'FOOD' if api == 'GetFoods' else 'DRINK'}_SYN_{i:05d}"
+            effects = ', '.join(rnd.sample(FOOD_EFFECTS, rnd.randint(1, 2)))
+            self.items[api].append({
+                'ItemCodeName': code,
+                'Hunger': rnd.randint(0, 30) if api == 'GetFoods' else 0,
+                'Thirst': rnd.randint(0, 30),
+                'Desc': f"Effects: {effects}\\nSynthetic item",
+            })
+        else:
+            prefix, item_type = PART_TYPES[api]
+            code = f"{prefix}_SYN_S{rnd.randint(1, 4):02d}_{i:05d}"
+            self.items[api].append({
+                'ItemCodeName': f"{code}_SCItem",
+                'Size': rnd.randint(1, 4),
+                'ItemClass': rnd.choice(PART_CLASSES),
+                'Grade': rnd.choice('ABCD'),
+                'Type': item_type,
+            })
+        return code
+
+    def write_ini(self, output_dir: str) -> dict[str, str]:
+        """写入en/cn/ref.ini，返回`{lang: 路径}`"""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = dict()
+        for lang, texts in self.texts.items():
+            path = paths[lang] = os.path.join(output_dir, f"{lang}.ini")
+            with open(path, 'w', encoding=config.ENCODE) as file:
+                file.writelines(f"{tid}={text}\n" for tid, text in zip(self.ids, texts))
+        return paths
+
+    def write_apis(self, output_dir: str) -> None:
+        """写入`<api>.json`，可以作为cstone_stub的数据目录"""
+        os.makedirs(output_dir, exist_ok=True)
+        for api, items in self.items.items():
+            with open(os.path.join(output_dir, f"{api}.json"), 'w', encoding='utf-8') as file:
+                json.dump(items, file)
+
+def write_synthetic_ini(path: str, lines: int, seed: int = 0) -> None:
+    """只写一个ini文件(en文本)"""
+    dataset = SyntheticDataset(lines, seed)
+    with open(path, 'w', encoding=config.ENCODE) as file:
+        file.writelines(f"{tid}={text}\n" for tid, text in zip(dataset.ids, dataset.texts['en']))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('output_dir')
+    parser.add_argument('--lines', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    dataset = SyntheticDataset(args.lines, args.seed)
+    dataset.write_ini(args.output_dir)
+    dataset.write_apis(os.path.join(args.output_dir, 'apis'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os, sys, marshal, hashlib
+import logging
+
+import config
+from base_ruleset import BaseRuleset
+
+_module_digests: dict[str, bytes] = dict()
+
+def module_digest(name: str) -> bytes:
+    """模块源文件的哈希，没有源文件时为模块中所有函数的代码"""
+    digest = _module_digests.get(name)
+    if digest is not None: return digest
+    module = sys.modules.get(name)
+    if module is None:
+        __import__(name)
+        module = sys.modules[name]
+    path = getattr(module, '__file__', None)
+    if path is not None and path.endswith('.py') and os.path.exists(path):
+        with open(path, 'rb') as file:
+            digest = hashlib.sha1(file.read()).digest()
+    else:
+        codes = [marshal.dumps(value.__code__) for _, value in sorted(vars(module).items()) if hasattr(value, '__code__')]
+        digest = hashlib.sha1(b''.join(codes)).digest()
+    _module_digests[name] = digest
+    return digest
+
+def sources_digest(paths: list[str]) -> bytes:
+    """数据文件(目录中的所有文件)的路径和内容哈希"""
+    digest = hashlib.sha1()
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, filename) for root, _, filenames in os.walk(path) for filename in filenames)
+        for file_path in files:
+            digest.update(file_path.encode('utf-8', 'surrogatepass') + b'\x00')
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as file:
+                    digest.update(hashlib.sha1(file.read()).digest())
+    return digest.digest()
+
+def ruleset_version(ruleset: BaseRuleset) -> str:
+    """
+    规则集的版本指纹，任何影响输出的代码或配置变化后缓存自动失效，包括：
+    类的继承链上各类所在模块的源文件(其中的辅助函数)、`VERSION_MODULES`中的模块、
+    `version_inputs`返回的配置和`get_sources`中数据文件的内容
+    """
+    cls = type(ruleset)
+    digest = hashlib.sha1(f"{cls.__module__}.{cls.__qualname__}".encode('utf-8'))
+    modules = dict.fromkeys([klass.__module__ for klass in cls.__mro__ if klass is not object] + list(cls.VERSION_MODULES))
+    for name in modules:
+        digest.update(module_digest(name))
+    digest.update(repr(ruleset.version_inputs()).encode('utf-8', 'surrogatepass'))
+    digest.update(sources_digest(ruleset.get_sources()))
+    return digest.hexdigest()
+
+class BuildManifest():
+
+    """
+    增量构建清单
+
+    记录每个输出ID的输入指纹和生成结果，指纹包含：
+    en/cn原文、生成该ID的规则集的代码和配置(参见 ruleset_version)、规则集中该ID对应的数据(`BaseRuleset.fingerprint`)
+    指纹不变的ID直接复用上次的结果，不再调用`translate`
+    """
+
+    def __init__(self, path: str = config.BUILD_MANIFEST_PATH) -> None:
+        self.path = path
+        self.entries: dict[str, tuple[str, str]] = dict()
+        self.new_entries: dict[str, tuple[str, str]] = dict()
+        self.versions: dict[BaseRuleset, str] = dict()    # 按规则集实例，常驻模式重建后数据文件可能已变化
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as file:
+                    self.entries = marshal.load(file)
+            except Exception as e:
+                logging.warning(f"[MANIFEST_EXECPTION] {path} 读取失败: {e}")
+
+    def key(self, ruleset: BaseRuleset, src_id: str|tuple, cn_str: str|None, en_str: str|None) -> str|None:
+        """计算输入指纹，规则集不支持缓存时返回None"""
+        data = ruleset.fingerprint(src_id)
+        if data is None: return None
+        version = self.versions.get(ruleset)
+        if version is None:
+            version = self.versions[ruleset] = ruleset_version(ruleset)
+        return hashlib.blake2b(repr((version, data, cn_str, en_str)).encode('utf-8'), digest_size=16).hexdigest()
+
+    def lookup(self, tid: str, key: str|None) -> str|None:
+        if key is None: return None
+        entry = self.entries.get(tid)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            self.new_entries[tid] = entry
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def record(self, tid: str, key: str|None, result: str) -> None:
+        if key is None: return
+        self.new_entries[tid] = (key, result)
+
+    def save(self) -> None:
+        """只保留本次构建涉及的ID"""
+        logging.info(f"Build manifest: {self.hits} reused, {self.misses} recomputed")
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as file:
+                marshal.dump(self.new_entries, file)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"[MANIFEST_EXECPTION] {self.path} 写入失败: {e}")
+        self.entries = self.new_entries
+        self.new_entries = dict()
+        self.versions = dict()
+        self.hits = 0
+        self.misses = 0
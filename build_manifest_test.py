@@ -0,0 +1,97 @@
+import sys, importlib
+
+import build_manifest
+from base_ruleset import BaseRuleset
+from build_manifest import BuildManifest, ruleset_version
+
+# 任何影响输出的代码、配置或数据文件变化后，同一ID的缓存都不能再命中
+
+RULESET_SOURCE = '''
+from base_ruleset import BaseRuleset
+
+def decorate(text):
+    return f"[{text}]"
+
+class HelperRuleset(BaseRuleset):
+    def __init__(self, source=None):
+        super().__init__()
+        self.source = source
+        self.id_set = {'ID'}
+    def get_sources(self):
+        return [self.source] if self.source else []
+    def fingerprint(self, tid):
+        return 'data'
+    def translate(self, tid, cn_str, en_str):
+        return decorate(cn_str)
+'''
+
+def load_ruleset_module(tmp_path, source):
+    (tmp_path / 'manifest_helper_ruleset.py').write_text(source, encoding='utf-8')
+    sys.path.insert(0, str(tmp_path))
+    try:
+        sys.modules.pop('manifest_helper_ruleset', None)
+        build_manifest._module_digests.clear()
+        return importlib.import_module('manifest_helper_ruleset')
+    finally:
+        sys.path.remove(str(tmp_path))
+
+def test_reuses_unchanged_result(tmp_path):
+    module = load_ruleset_module(tmp_path, RULESET_SOURCE)
+    path = str(tmp_path / 'manifest.bin')
+    manifest = BuildManifest(path)
+    ruleset = module.HelperRuleset()
+    key = manifest.key(ruleset, 'ID', '中文', 'en')
+    assert manifest.lookup('ID', key) is None
+    manifest.record('ID', key, '[中文]')
+    manifest.save()
+    manifest = BuildManifest(path)
+    assert manifest.lookup('ID', manifest.key(module.HelperRuleset(), 'ID', '中文', 'en')) == '[中文]'
+    assert manifest.lookup('ID', manifest.key(module.HelperRuleset(), 'ID', '中文2', 'en')) is None
+
+def test_helper_code_change_invalidates(tmp_path):
+    module = load_ruleset_module(tmp_path, RULESET_SOURCE)
+    before = ruleset_version(module.HelperRuleset())
+    module = load_ruleset_module(tmp_path, RULESET_SOURCE.replace('f"[{text}]"', 'f"<{text}>"'))
+    assert ruleset_version(module.HelperRuleset()) != before
+
+def test_data_file_change_invalidates(tmp_path):
+    module = load_ruleset_module(tmp_path, RULESET_SOURCE)
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'a.txt').write_text('A=1', encoding='utf-8')
+    before = ruleset_version(module.HelperRuleset(str(data)))
+    assert ruleset_version(module.HelperRuleset(str(data))) == before
+    (data / 'a.txt').write_text('A=2', encoding='utf-8')
+    assert ruleset_version(module.HelperRuleset(str(data))) != before
+
+def test_config_change_invalidates():
+    class Flagged(BaseRuleset):
+        def __init__(self, flag):
+            super().__init__()
+            self.flag = flag
+        def translate(self, tid, cn_str, en_str):
+            return cn_str
+    assert ruleset_version(Flagged(True)) != ruleset_version(Flagged(False))
+
+def test_declarative_template_change_invalidates(tmp_path):
+    import json
+    from cstone_ruleset import load_ruleset_definition
+    files = dict()
+    for key in ('special_id_file', 'replace_map_file', 'ignore_id_file'):
+        files[key] = str(tmp_path / f"{key}.txt")
+        (tmp_path / f"{key}.txt").write_text('', encoding='utf-8')
+    definition = {
+        'name': 'CstoneTemplateTest',
+        'apis': [],
+        **files,
+        'base_id': {'field': 'ItemCodeName'},
+        'id_patterns': ['item_Name{base_id}'],
+        'fields': {'size': {'field': 'Size', 'transform': ['int']}},
+        'template': '{en} [{cn}] S{size}',
+    }
+    versions = list()
+    for template in ('{en} [{cn}] S{size}', '{cn} [{en}] S{size}'):
+        path = tmp_path / 'definition.json'
+        path.write_text(json.dumps({**definition, 'template': template}), encoding='utf-8')
+        versions.append(ruleset_version(load_ruleset_definition(str(path))(auto_grab=False)))
+    assert versions[0] != versions[1]
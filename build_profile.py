@@ -0,0 +1,182 @@
+import os, time, heapq
+import pstats, cProfile, tracemalloc
+import logging
+from contextlib import contextmanager
+from typing import Callable
+
+import config
+
+# 生成折叠栈时忽略耗时低于该值(秒)的分支
+COLLAPSE_MIN_SECONDS = 1e-5
+COLLAPSE_MAX_DEPTH = 64
+# 分配位置中排除分析本身的开销
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+
+def frame_label(func: tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == '~':
+        return name.replace(';', ',')
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ',')
+
+def collapse_stats(stats: pstats.Stats, root: str) -> dict[str, float]:
+    """
+    把cProfile的调用关系展开为折叠栈 `{"root;f1;f2": 自身耗时}`
+
+    cProfile只记录直接的调用者，函数在某条路径上的耗时按该调用者占其总耗时的比例分摊
+    """
+    entries = stats.stats
+    children: dict[tuple, dict[tuple, float]] = dict()
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, dict())[func] = edge[3]
+    collapsed = dict()
+
+    def walk(func, path: list[str], scale: float, visiting: set):
+        _, _, tt, ct, _ = entries[func]
+        path = path + [frame_label(func)]
+        key = ';'.join(path)
+        collapsed[key] = collapsed.get(key, 0.0) + tt * scale
+        if len(path) >= COLLAPSE_MAX_DEPTH: return
+        for child, edge_ct in children.get(func, dict()).items():
+            child_ct = entries[child][3]
+            if child in visiting or child_ct <= 0: continue
+            child_scale = scale * min(edge_ct / child_ct, 1.0)
+            if child_ct * child_scale < COLLAPSE_MIN_SECONDS: continue
+            walk(child, path, child_scale, visiting | {child})
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if len(callers) == 0:
+            walk(func, [root], 1.0, {func})
+    return collapsed
+
+class ProfileSection():
+
+    """一个被分析的阶段或规则集操作的耗时、内存和cProfile数据"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.allocated = 0      # 阶段结束时仍被引用的新分配内存(字节)
+        self.peak = 0           # 阶段内的内存峰值相对开始时的增量(字节)
+        self.sites: dict[str, int] = dict()    # 分配位置 -> 字节
+        self.stats: pstats.Stats|None = None
+
+class BuildProfiler():
+
+    """
+    构建分析(run.py --profile)
+
+    各阶段和每个规则集的创建、翻译分别用cProfile和tracemalloc记录，
+    结束后输出可用于火焰图的折叠栈、每个`section`的内存分配汇总以及最慢的`translate`调用
+    分析期间规则集的创建和翻译都在当前进程中串行执行，未启用时不会创建本对象
+    """
+
+    def __init__(self, output_dir: str = config.PROFILE_DIR, top_n: int = config.PROFILE_TOP_N) -> None:
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.sections: dict[str, ProfileSection] = dict()
+        self.slow_calls: list[tuple[float, int, str, str]] = list()    # 小顶堆 (耗时, 序号, 规则集, ID)
+        self.counter = 0
+        self.active: str|None = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(config.PROFILE_TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def section(self, name: str):
+        """分析一段代码，嵌套的`section`计入外层"""
+        if self.active is not None:
+            yield
+            return
+        self.active = name
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = ProfileSection(name)
+        before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        start_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            section.calls += 1
+            section.seconds += time.perf_counter() - start
+            end_memory, peak = tracemalloc.get_traced_memory()
+            section.allocated += end_memory - start_memory
+            section.peak = max(section.peak, peak - start_memory)
+            after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            for diff in after.compare_to(before, 'lineno')[:config.PROFILE_TOP_N]:
+                if diff.size_diff <= 0: continue
+                site = str(diff.traceback)
+                section.sites[site] = section.sites.get(site, 0) + diff.size_diff
+            if section.stats is None:
+                section.stats = pstats.Stats(profile)
+            else:
+                section.stats.add(profile)
+            self.active = None
+
+    def timed(self, ruleset_name: str, translate: Callable, resolved: dict|None = None) -> Callable:
+        """包装`translate`，记录最慢的调用，`resolved`为`{规则集的源ID: 实际翻译的ID}`，用于候选ID元组"""
+        resolved = resolved or dict()
+        def wrapper(id, cn_str, en_str):
+            start = time.perf_counter()
+            try:
+                return translate(id, cn_str, en_str)
+            finally:
+                self.record_call(ruleset_name, resolved.get(id, id), time.perf_counter() - start)
+        return wrapper
+
+    def record_call(self, ruleset_name: str, tid, seconds: float) -> None:
+        self.counter += 1
+        item = (seconds, self.counter, ruleset_name, str(tid))
+        if len(self.slow_calls) < self.top_n:
+            heapq.heappush(self.slow_calls, item)
+        elif seconds > self.slow_calls[0][0]:
+            heapq.heapreplace(self.slow_calls, item)
+
+    def summary(self) -> str:
+        header = f"{'section':<40}{'calls':>7}{'time(s)':>10}{'alloc(KB)':>12}{'peak(KB)':>12}"
+        lines = [header, '-' * len(header)]
+        for section in self.sections.values():
+            lines.append(
+                f"{section.name:<40}{section.calls:>7}{section.seconds:>10.3f}"
+                f"{section.allocated / 1024:>12.1f}{section.peak / 1024:>12.1f}"
+            )
+        lines.append("slowest translate calls:")
+        for seconds, _, ruleset_name, tid in sorted(self.slow_calls, reverse=True):
+            lines.append(f"  {seconds * 1000:>9.3f}ms  {ruleset_name}  {tid}")
+        return '\n'.join(lines)
+
+    def write(self) -> None:
+        """
+        写入分析结果：
+        - `profile.collapsed`: 折叠栈(微秒)，可用flamegraph.pl/speedscope等工具查看
+        - `<section>.prof`: 各section的cProfile数据，可用pstats/snakeviz查看
+        - `allocations.txt`: 各section的内存汇总和主要分配位置
+        - `slow_translate.txt`: 最慢的translate调用
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        collapsed = dict()
+        for section in self.sections.values():
+            if section.stats is None: continue
+            section.stats.dump_stats(os.path.join(self.output_dir, f"{section.name}.prof"))
+            for stack, seconds in collapse_stats(section.stats, section.name).items():
+                collapsed[stack] = collapsed.get(stack, 0.0) + seconds
+        with open(os.path.join(self.output_dir, 'profile.collapsed'), 'w', encoding='utf-8') as file:
+            for stack, seconds in collapsed.items():
+                micros = int(seconds * 1e6)
+                if micros > 0:
+                    file.write(f"{stack} {micros}\n")
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as file:
+            for section in sorted(self.sections.values(), key=lambda s: -s.peak):
+                file.write(f"[{section.name}] allocated {section.allocated / 1024:.1f}KB, peak {section.peak / 1024:.1f}KB\n")
+                for site, size in sorted(section.sites.items(), key=lambda item: -item[1])[:config.PROFILE_TOP_N]:
+                    file.write(f"  {size / 1024:>10.1f}KB  {site}\n")
+        with open(os.path.join(self.output_dir, 'slow_translate.txt'), 'w', encoding='utf-8') as file:
+            for seconds, _, ruleset_name, tid in sorted(self.slow_calls, reverse=True):
+                file.write(f"{seconds * 1000:.3f}ms\t{ruleset_name}\t{tid}\n")
+        logging.info(f"Profile summary:\n{self.summary()}")
+        logging.info(f"Profile written to {self.output_dir}")
@@ -0,0 +1,129 @@
+import os, json, time
+import random
+import logging
+
+import config
+
+class RulesetStats():
+
+    """单个规则集的计数"""
+
+    # 每类问题保留的示例条数
+    MAX_SAMPLES = 5
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.claimed = 0        # 规则集声明的ID数
+        self.translated = 0     # 调用translate生成
+        self.reused = 0         # 增量构建复用
+        self.skipped = 0        # 已被之前的规则集处理
+        self.missing = 0        # ID不存在
+        self.failed = 0         # translate抛出异常
+        self.init_seconds = 0.0
+        self.process_seconds = 0.0
+        self.patterns: dict[str, int] = dict()  # 每种候选ID匹配方式的次数
+        self.samples: dict[str, list[str]] = dict()
+
+    def sample(self, kind: str, message: str) -> None:
+        samples = self.samples.setdefault(kind, [])
+        if len(samples) < self.MAX_SAMPLES:
+            samples.append(message)
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+class BuildStats():
+
+    """
+    构建过程的统计
+
+    按规则集聚合计数和耗时，构建结束后输出汇总表和JSON报告
+    逐ID的详细信息只在`tracing()`为真时输出(DEBUG等级或按抽样率)
+    """
+
+    def __init__(self, sample_rate: float = config.TRACE_SAMPLE_RATE) -> None:
+        self.sample_rate = sample_rate
+        self.debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        self.rulesets: dict[str, RulesetStats] = dict()
+        self.fallback = 0       # 生成时没有结果也没有ref，使用cn/en
+        self.empty = 0          # 生成时找不到任何文本
+        self.conflicts: list[tuple[str, str, str]] = list()  # (ID, 生效的规则集, 被忽略的规则集)
+        self.validation: dict[str, int] = dict()    # 输出校验每类问题的数量
+        self.validation_samples: dict[str, list[str]] = dict()
+        self.start_time = time.time()
+
+    def ruleset(self, name: str) -> RulesetStats:
+        stats = self.rulesets.get(name)
+        if stats is None:
+            stats = self.rulesets[name] = RulesetStats(name)
+        return stats
+
+    def conflict(self, tid: str, owner: str, other: str) -> None:
+        self.conflicts.append((tid, owner, other))
+
+    def validation_issue(self, kind: str, message: str) -> None:
+        self.validation[kind] = self.validation.get(kind, 0) + 1
+        samples = self.validation_samples.setdefault(kind, [])
+        if len(samples) < RulesetStats.MAX_SAMPLES:
+            samples.append(message)
+
+    def tracing(self) -> bool:
+        if self.debug: return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def trace(self, message: str) -> None:
+        if self.debug:
+            logging.debug(message)
+        else:
+            logging.info(message)
+
+    def summary(self) -> str:
+        header = f"{'ruleset':<24}{'claimed':>9}{'trans':>9}{'reused':>9}{'skipped':>9}{'missing':>9}{'failed':>9}{'init(s)':>9}{'proc(s)':>9}"
+        lines = [header, '-' * len(header)]
+        for stats in self.rulesets.values():
+            lines.append(
+                f"{stats.name:<24}{stats.claimed:>9}{stats.translated:>9}{stats.reused:>9}{stats.skipped:>9}"
+                f"{stats.missing:>9}{stats.failed:>9}{stats.init_seconds:>9.3f}{stats.process_seconds:>9.3f}"
+            )
+        for stats in self.rulesets.values():
+            if len(stats.patterns) > 1:
+                patterns = ', '.join(f"{pattern}={count}" for pattern, count in sorted(stats.patterns.items()))
+                lines.append(f"{stats.name} matched by: {patterns}")
+        lines.append(f"fallback: {self.fallback}, empty: {self.empty}, conflicts: {len(self.conflicts)}")
+        if len(self.validation):
+            lines.append(f"validation: {', '.join(f'{kind}={count}' for kind, count in sorted(self.validation.items()))}")
+        return '\n'.join(lines)
+
+    def log_summary(self) -> None:
+        logging.info(f"Build summary:\n{self.summary()}")
+        for stats in self.rulesets.values():
+            for kind, samples in stats.samples.items():
+                count = {'PROC_MISSINGID': stats.missing, 'PROC_EXECPTION': stats.failed}.get(kind, len(samples))
+                logging.warning(f"[{kind}] {stats.name} ({count}): {'; '.join(samples)}")
+        pairs = dict()
+        for _, owner, other in self.conflicts:
+            pairs[(owner, other)] = pairs.get((owner, other), 0) + 1
+        for (owner, other), count in pairs.items():
+            logging.warning(f"[PROC_CONFLICT] {count} IDs claimed by both {owner} and {other}, using {owner}")
+        for kind, samples in self.validation_samples.items():
+            logging.warning(f"[VALIDATE_{kind.upper()}] ({self.validation[kind]}): {'; '.join(samples)}")
+
+    def to_dict(self) -> dict:
+        return {
+            'start_time': self.start_time,
+            'seconds': time.time() - self.start_time,
+            'rulesets': [stats.to_dict() for stats in self.rulesets.values()],
+            'fallback': self.fallback,
+            'empty': self.empty,
+            'conflicts': self.conflicts,
+            'validation': self.validation,
+        }
+
+    def write_report(self, path: str = config.BUILD_REPORT_PATH) -> None:
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+            logging.info(f"Build report written to {path}")
+        except Exception as e:
+            logging.warning(f"[REPORT_EXECPTION] {path} 写入失败: {e}")
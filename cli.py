@@ -0,0 +1,155 @@
+"""
+命令行入口(run.py)
+
+规则集按名称从注册表中选择(参见 ruleset_registry.py)，只导入选中的规则集所在的模块，
+生成器、cstone抓取(requests)等依赖都在用到时才导入
+"""
+
+import os, sys
+import argparse
+from functools import partial
+
+import config
+import ruleset_registry
+
+VERSION_ID = config.VERSION_TEXT_ID
+
+# 输出文件 名称 -> (文件名, 参与的规则集(None为全部), 版本号后缀)
+VARIANTS = {
+    # 完整版
+    'full': ('output.ini', None, '_ZapAug'),
+    # 仅双语(不含数据)
+    'bilingual': ('output_bilingual.ini', ['GeneralReplaceRuleset', 'TextSubstitutionRuleset'], '_ZapAug_Bilingual'),
+    # 仅数据
+    'stats': ('output_stats.ini', ['CstoneFoodAndDrink', 'CstoneMissile', 'CstoneShipParts', 'BombRuleset', 'TextSubstitutionRuleset'], '_ZapAug_Stats'),
+}
+# 默认只生成完整版，其余输出通过--variants选择
+DEFAULT_VARIANTS = ['full']
+
+def create_variants(maker, text_dir: str = config.TEXT_FILE_DIR, names: list[str]|None = None, output_dir: str|None = None) -> list:
+    from output_writer import OutputVariant
+    version = maker.get_text(VERSION_ID)
+    variants = list()
+    for name in names or DEFAULT_VARIANTS:
+        filename, rulesets, suffix = VARIANTS[name]
+        variants.append(OutputVariant(
+            os.path.join(output_dir or text_dir, filename),
+            rulesets=rulesets,
+            suffix_data={VERSION_ID: f"{version}{suffix}"}
+        ))
+    return variants
+
+def version_name(text_dir: str) -> str:
+    return os.path.basename(os.path.normpath(text_dir))
+
+def create_version_variants(maker, text_dir: str, names: list[str]|None = None, output_dir: str|None = None) -> list:
+    """同时构建多个版本时，各版本写入`output_dir`下以文本目录名命名的子目录，避免互相覆盖"""
+    if output_dir is not None:
+        output_dir = os.path.join(output_dir, version_name(text_dir))
+        os.makedirs(output_dir, exist_ok=True)
+    return create_variants(maker, text_dir, names, output_dir)
+
+def list_rulesets() -> None:
+    rulesets = ruleset_registry.available_rulesets()
+    width = max(len(name) for name in rulesets)
+    for name, spec in rulesets.items():
+        default = '*' if name in ruleset_registry.DEFAULT_RULESETS else ' '
+        network = 'cstone' if ruleset_registry.requires_network(spec) else ''
+        print(f"{default} {name:<{width}}  {spec:<48}{network}")
+    print('* 默认构建的规则集')
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='run.py',
+        description='生成增强汉化文件，比较两个版本的文本使用 `run.py diff OLD_DIR NEW_DIR`，应用增量补丁使用 `run.py apply-patch BASE PATCH...`，'
+                    '为找不到ID的cstone物品推荐映射使用 `run.py suggest-ids`，按文本内容查找ID使用 `run.py search QUERY`，'
+                    '比较物品库中两个版本的cstone数据使用 `run.py items diff OLD NEW`'
+    )
+    parser.add_argument('--list-rulesets', action='store_true', help='列出可用的规则集')
+    parser.add_argument('--text-dir', default=None, help=f"包含en/cn/ref.ini的目录(默认{config.TEXT_FILE_DIR})")
+    parser.add_argument('--output-dir', default=None, help='输出目录，默认与--text-dir相同；使用--versions时各版本写入其中以文本目录名命名的子目录')
+    parser.add_argument('--rulesets', nargs='+', default=ruleset_registry.DEFAULT_RULESETS, metavar='NAME', help='按优先级排列的规则集名称')
+    parser.add_argument('--variants', nargs='+', default=DEFAULT_VARIANTS, choices=list(VARIANTS), help=f"生成的输出文件(默认{' '.join(DEFAULT_VARIANTS)})")
+    parser.add_argument('--watch', action='store_true', help='生成后常驻，custom中的数据文件变化时只重建对应的规则集')
+    parser.add_argument('--profile', nargs='?', const=config.PROFILE_DIR, default=None, metavar='DIR', help=f"分析各阶段和规则集的耗时与内存，结果写入DIR(默认{config.PROFILE_DIR})")
+    parser.add_argument('--profile-top', type=int, default=config.PROFILE_TOP_N, help='输出最慢的translate调用条数')
+    parser.add_argument('--release', nargs='?', const=config.RELEASE_DIR, default=None, metavar='DIR', help=f"生成后发布输出文件，并生成相对上一次发布的增量补丁(默认{config.RELEASE_DIR})")
+    parser.add_argument('--versions', nargs='+', metavar='DIR', help='同时构建多个版本的文本目录(如text_files/live text_files/ptu)，共用一次cstone抓取')
+    return parser
+
+def build(argv: list[str]) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.list_rulesets:
+        list_rulesets()
+        return 0
+    try:
+        rulesets = ruleset_registry.load_rulesets(args.rulesets)
+    except KeyError as e:
+        parser.error(e.args[0])
+
+    if args.versions:
+        # 各版本在子进程中构建，不支持常驻和构建分析
+        for option, value in (('--text-dir', args.text_dir), ('--watch', args.watch), ('--profile', args.profile)):
+            if value: parser.error(f"{option} 不能与 --versions 同时使用")
+        from batch_build import build_versions
+        results = build_versions(args.versions, rulesets, partial(create_version_variants, names=args.variants, output_dir=args.output_dir))
+        if args.release is not None:
+            from release_patch import release_outputs
+            for result in results:
+                if 'error' in result: continue
+                # 各版本分别发布
+                release_outputs(result['outputs'], os.path.join(args.release, version_name(result['text_dir'])), result['version'])
+        return 1 if any('error' in result for result in results) else 0
+
+    text_dir = args.text_dir or config.TEXT_FILE_DIR
+    from generation_manager import GenerationManager
+    profiler = None
+    if args.profile is not None:
+        from build_profile import BuildProfiler
+        profiler = BuildProfiler(args.profile, args.profile_top)
+
+    maker = GenerationManager(
+        os.path.join(text_dir, 'en.ini'),
+        os.path.join(text_dir, 'cn.ini'),
+        os.path.join(text_dir, 'ref.ini'),
+        profiler=profiler
+    )
+    maker.apply_rulesets(rulesets)
+
+    variants = create_variants(maker, text_dir, args.variants, args.output_dir)
+    if args.watch:
+        from watch import watch
+        watch(maker, variants)
+    else:
+        maker.generate_variants(variants)
+        if args.release is not None:
+            from release_patch import release_outputs
+            release_outputs([variant.output_path for variant in variants], args.release, maker.get_text(VERSION_ID))
+    if profiler is not None:
+        profiler.write()
+    return 0
+
+def main(argv: list[str]|None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if len(argv) and argv[0] == 'diff':
+        from patch_diff import main as diff_main
+        diff_main(argv[1:])
+        return 0
+    if len(argv) and argv[0] == 'search':
+        from text_index import main as search_main
+        search_main(argv[1:])
+        return 0
+    if len(argv) and argv[0] == 'suggest-ids':
+        from id_suggest import main as suggest_main
+        suggest_main(argv[1:])
+        return 0
+    if len(argv) and argv[0] == 'items':
+        from item_store import main as items_main
+        items_main(argv[1:])
+        return 0
+    if len(argv) and argv[0] == 'apply-patch':
+        from release_patch import main as apply_main
+        apply_main(argv[1:])
+        return 0
+    return build(argv)
@@ -1,3 +1,4 @@
+import os
 import logging
 
 logging.basicConfig(level=logging.INFO, force=True)
@@ -5,7 +6,98 @@ logging.basicConfig(level=logging.INFO, force=True)
 TEXT_FILE_DIR = 'text_files\\4.4.0'
 EN_FILE_NAME = 'en.ini'
 CN_FILE_NAME = 'cn.ini'
+# 文本中记录汉化版本号的ID，输出文件在其后追加后缀，发布时也以此作为版本
+VERSION_TEXT_ID = '_starcitizen_doctor_localization_version'
 ENCODE = 'utf-8-sig'
+# 游戏文本文件的编码，None为自动检测(参见 text_encoding.sniff_encoding)
+TEXT_ENCODING = None
 
 UNKNOWN_CHR = '\ufffd'
-REPLACE_CHR = ' '
\ No newline at end of file
+REPLACE_CHR = ' '
+# 编码检测使用的样本大小(字节)
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# 每个文件最多输出的解码错误条数
+DECODE_ERROR_LOG_LIMIT = 20
+
+# 本地缓存目录
+CACHE_DIR = 'cache'
+# 解析后的语言文件快照，文件未变化时直接加载快照而不重新解析
+SNAPSHOT_CACHE = True
+SNAPSHOT_CACHE_DIR = os.path.join(CACHE_DIR, 'snapshot')
+# 文本内容的倒排索引(run.py search)，按文本指纹缓存
+TEXT_INDEX_PATH = os.path.join(CACHE_DIR, 'text_index.bin')
+# 增量构建，输入和规则集都未变化的ID直接使用上次的结果
+INCREMENTAL_BUILD = True
+BUILD_MANIFEST_PATH = os.path.join(CACHE_DIR, 'build_manifest.bin')
+
+# 全局文本替换(TextSubstitutionRuleset)时把连续的空白视为一个空格，并去掉输出文本首尾的空白
+SUBSTITUTION_NORMALIZE_WHITESPACE = False
+
+# 候选ID解析
+ID_ALIAS_FILE = 'custom/id_alias.txt'     # ID片段别名(如拼写错误)，所有候选都找不到时替换后重试
+RESOLVER_CACHE_PATH = os.path.join(CACHE_DIR, 'id_resolver.bin')
+
+# 为找不到ID的cstone物品推荐映射(run.py suggest-ids)
+SUGGEST_ID_PREFIXES = ['item_Name', 'items_commodities']   # 只在这些前缀(不区分大小写)的ID中查找，比较时去掉前缀
+SUGGEST_TOP_N = 3                  # 每个物品输出的候选数
+SUGGEST_RERANK = 30                # 按n-gram初筛后精确比较的候选数
+SUGGEST_MAX_DF = 0.05              # 出现在超过该比例ID中的n-gram不参与初筛
+SUGGEST_MIN_SCORE = 0.3
+SUGGEST_OUTPUT_DIR = os.path.join(CACHE_DIR, 'suggestions')
+
+# 规则集执行
+RULESET_WORKERS = os.cpu_count() or 4        # 并发构建规则集的线程数/翻译的进程数
+# 翻译的执行方式: 'serial' 当前进程内执行, 'process' 多进程, 'auto' 任务数超过阈值时使用多进程
+TRANSLATE_EXECUTOR = 'auto'
+TRANSLATE_PROCESS_THRESHOLD = 20000
+
+# 输出校验，检查规则集结果和后缀数据中的占位符、转义序列、重复ID和长度
+# 'off' 不校验, 'warn' 只输出警告, 'error' 有问题时中止生成
+OUTPUT_VALIDATION = 'warn'
+# 按ID前缀(不区分大小写，最长前缀优先)限制文本的最大长度，默认不限制
+# 内置的数据规则集(如炸弹、食物)会生成较长的多行名称，设置时需要高于这些输出，例如 {'vehicle_Name': 200}
+OUTPUT_LENGTH_BUDGETS: dict[str, int] = {}
+VALIDATE_CHUNK_SIZE = 20000
+VALIDATE_PROCESS_THRESHOLD = 100000     # 待校验的文本数超过阈值时分块多进程校验
+
+# 多版本构建(run.py --versions)，每个版本在一个子进程中生成，缓存放在各自的子目录中
+BATCH_WORKERS = min(os.cpu_count() or 4, 4)
+BATCH_CACHE_DIR = os.path.join(CACHE_DIR, 'versions')
+
+# 常驻模式(run.py --watch)轮询数据文件变化的间隔(秒)
+WATCH_INTERVAL = 0.05
+
+# 增量发布(run.py --release)，保留上一次发布的文件，按ID生成相邻版本之间的压缩补丁
+RELEASE_DIR = 'releases'
+RELEASE_PATCH_PRESET = 9           # 补丁的lzma压缩等级
+
+# 构建分析(run.py --profile)
+PROFILE_DIR = os.path.join(CACHE_DIR, 'profile')
+PROFILE_TOP_N = 20                 # 输出最慢的translate调用和主要内存分配位置的条数
+PROFILE_TRACEMALLOC_FRAMES = 1     # tracemalloc记录的调用栈深度
+
+# 构建统计
+# 逐ID的详细日志只在日志等级为DEBUG，或按TRACE_SAMPLE_RATE(0~1)抽样时输出
+TRACE_SAMPLE_RATE = 0.0
+BUILD_REPORT_PATH = os.path.join(CACHE_DIR, 'build_report.json')
+
+# cstone API
+CSTONE_BASE_URL = 'https://finder.cstone.space'
+CSTONE_CACHE_DIR = os.path.join(CACHE_DIR, 'cstone')
+CSTONE_CACHE_TTL = 6 * 60 * 60     # 缓存有效期(秒)，超过后使用条件请求重新验证
+CSTONE_TIMEOUT = 30                # 单次请求超时(秒)
+CSTONE_MAX_WORKERS = 8             # 并发抓取的最大连接数
+CSTONE_RETRIES = 3                 # 失败重试次数
+CSTONE_BACKOFF = 0.5               # 重试退避系数(秒)，第n次重试等待 BACKOFF * 2^(n-1)
+# 离线模式，完全使用本地缓存构建(CI中可以设置环境变量 SC_CSTONE_OFFLINE=1)
+CSTONE_OFFLINE = os.environ.get('SC_CSTONE_OFFLINE', '0') == '1'
+# cstone物品库(SQLite)，抓取到的数据按版本写入，未过期时直接从库中读取(参见 item_store.py)
+ITEM_STORE_ENABLED = True
+ITEM_STORE_PATH = os.path.join(CACHE_DIR, 'items.sqlite')
+ITEM_STORE_VERSION: str|None = None     # 写入和读取时固定使用的版本，None时为正在构建的文本目录名
+ITEM_KEY_FIELD = 'ItemCodeName'     # 物品的唯一键
+ITEM_NAME_FIELD = 'Name'
+# 数据文件定义的cstone规则集，参见 cstone_ruleset.DeclarativeCstoneRuleset
+RULESET_DEFINITION_DIR = 'custom/rulesets'
+# 额外的规则集 {名称: "模块:类名"}，可以在命令行中按名称选择(参见 ruleset_registry.py)
+RULESET_PLUGINS: dict[str, str] = {}
@@ -0,0 +1,178 @@
+import os, time, json, hashlib
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+class CstoneApiCache():
+
+    """
+    cstone API响应的本地磁盘缓存
+
+    响应内容按内容的sha1存放在`objects/`下，`index.json`记录每个URL对应的内容哈希、
+    抓取时间以及`ETag`/`Last-Modified`，用于过期后的条件请求
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = config.CSTONE_CACHE_DIR,
+        ttl: float = config.CSTONE_CACHE_TTL,
+        offline: bool = config.CSTONE_OFFLINE
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.object_dir = os.path.join(cache_dir, 'objects')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.ttl = ttl
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.index = dict()
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as file:
+                    self.index = json.load(file)
+            except Exception as e:
+                logging.warning(f"[CACHE_EXECPTION] {self.index_path} 读取失败: {e}")
+
+    def get(self, url: str) -> dict|None:
+        entry = self.index.get(url)
+        if entry is None: return None
+        if not os.path.exists(self.__object_path(entry['hash'])): return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def load(self, entry: dict):
+        with open(self.__object_path(entry['hash']), 'rb') as file:
+            return json.loads(file.read())
+
+    def store(self, url: str, content: bytes, headers) -> None:
+        digest = hashlib.sha1(content).hexdigest()
+        path = self.__object_path(digest)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(self.object_dir, exist_ok=True)
+                self.__write_atomic(path, content)
+            self.index[url] = {
+                'hash': digest,
+                'fetched_at': time.time(),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+            }
+            self.__save_index()
+
+    def touch(self, url: str) -> None:
+        # 304 Not Modified，只刷新抓取时间
+        with self.lock:
+            self.index[url]['fetched_at'] = time.time()
+            self.__save_index()
+
+    def __object_path(self, digest: str) -> str:
+        return os.path.join(self.object_dir, f"{digest}.json")
+
+    def __save_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        content = json.dumps(self.index, ensure_ascii=False, indent=2).encode('utf-8')
+        self.__write_atomic(self.index_path, content)
+
+    def __write_atomic(self, path: str, content: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+_default_cache: CstoneApiCache|None = None
+
+def get_default_cache() -> CstoneApiCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CstoneApiCache()
+    return _default_cache
+
+def fetch_api(
+    api: str,
+    base_url: str = config.CSTONE_BASE_URL,
+    cache: CstoneApiCache|None = None,
+    session: requests.Session|None = None
+):
+    """
+    获取一个API的数据，优先使用缓存
+
+    - 缓存未过期，或处于离线模式时直接返回缓存
+    - 缓存过期时带上`If-None-Match`/`If-Modified-Since`重新验证，304则继续使用缓存
+    - 请求失败但存在旧缓存时退回旧缓存
+    """
+    api = api.removeprefix('/')
+    url = f"{base_url.removesuffix('/')}/{api}"
+    cache = cache if cache is not None else get_default_cache()
+
+    entry = cache.get(url)
+    if entry is not None and (cache.offline or cache.is_fresh(entry)):
+        logging.info(f"Using cached {url}")
+        return cache.load(entry)
+    if cache.offline:
+        raise RuntimeError(f"[CSTONE_OFFLINE] {url} 没有缓存，无法离线构建")
+
+    headers = dict()
+    if entry is not None:
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+    now_timestamp = int(time.time() * 1000)
+    try:
+        logging.info(f"Fetching {url}")
+        response = (session or requests).get(f"{url}?_={now_timestamp}", headers=headers, timeout=config.CSTONE_TIMEOUT)
+        if response.status_code == 304 and entry is not None:
+            cache.touch(url)
+            return cache.load(entry)
+        response.raise_for_status()
+    except Exception as e:
+        if entry is None: raise
+        logging.warning(f"[CSTONE_EXECPTION] {e}, 使用{url}的旧缓存")
+        return cache.load(entry)
+    cache.store(url, response.content, response.headers)
+    return response.json()
+
+def create_session(pool_size: int = config.CSTONE_MAX_WORKERS) -> requests.Session:
+    """创建带连接池和重试退避的Session"""
+    retry = Retry(
+        total=config.CSTONE_RETRIES,
+        backoff_factor=config.CSTONE_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',)
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def fetch_apis(
+    apis: list[str],
+    base_url: str = config.CSTONE_BASE_URL,
+    max_workers: int = config.CSTONE_MAX_WORKERS,
+    cache: CstoneApiCache|None = None
+) -> dict:
+    """
+    并发获取多个API的数据，共用一个Session
+
+    返回`{api: json_data}`，获取失败的API不会出现在结果中
+    """
+    apis = list(dict.fromkeys(apis))
+    result = dict()
+    if len(apis) == 0: return result
+    start = time.perf_counter()
+    with create_session(max_workers) as session:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(apis))) as executor:
+            futures = {executor.submit(fetch_api, api, base_url, cache, session): api for api in apis}
+            for future in as_completed(futures):
+                api = futures[future]
+                try:
+                    result[api] = future.result()
+                except Exception as e:
+                    logging.warning(f"[CSTONE_EXECPTION] {api} 预取失败: {e}")
+    logging.info(f"Fetched {len(result)}/{len(apis)} apis in {time.perf_counter() - start:.2f}s")
+    return result
@@ -1,21 +1,26 @@
-import time, re
-import requests
+import os, re, json
 import logging
 from abc import abstractmethod
 from base_ruleset import BaseRuleset
 
 import config
-from utils import read_file_lines
+from item_store import load_api, load_apis
+from utils import iter_file_lines
+from ruleset_definition import CompiledTemplate, compile_extractor
 
 class CstoneBaseRuleset(BaseRuleset):
     
+    # 物品显示名称(英文)的字段，用于为找不到ID的物品推荐映射(参见 id_suggest.py)
+    NAME_FIELD = 'Name'
+    
     def __init__(
         self, 
         special_id_file, 
         replace_map_file, 
         ignore_id_file, 
-        base_url: str = 'https://finder.cstone.space', 
-        auto_grab = True
+        base_url: str = config.CSTONE_BASE_URL, 
+        auto_grab = True,
+        prefetched: dict|None = None
     ) -> None:
         
         super().__init__()
@@ -23,38 +28,57 @@ class CstoneBaseRuleset(BaseRuleset):
         self.base_url = base_url
         self.data = dict()
         self.apis = list()
+        # 预先抓取好的API数据 {api: json_data}，参见 GenerationManager.prefetch
+        self.prefetched = dict(prefetched) if prefetched is not None else dict()
         
         self.special_id_map = dict()
         self.replace_map    = dict()
         self.ignore_ids     = set()
+        self.items          = dict()    # 候选ID -> (基础ID, 显示名称)
+        self.sources        = [special_id_file, replace_map_file, ignore_id_file]
         with open(special_id_file, 'r', encoding=config.ENCODE, errors='replace') as file:
             logging.info(f"Reading {special_id_file}")
-            for line in read_file_lines(file):
+            for line in iter_file_lines(file):
                 target, _, tid = line.partition('=')
                 tid = tid.removesuffix('\n')
                 self.special_id_map[target] = tid
         with open(replace_map_file, 'r', encoding=config.ENCODE, errors='replace') as file:
             logging.info(f"Reading {replace_map_file}")
-            for line in read_file_lines(file):
+            for line in iter_file_lines(file):
                 src, _, dst = line.partition('=')
                 dst = dst.removesuffix('\n')
-                self.replace_map[src] = dst
+                # 数据中的空白不固定(如`Civilian `)，键按合并空白后的文本保存
+                self.replace_map[' '.join(src.split())] = dst
         with open(ignore_id_file, 'r', encoding=config.ENCODE, errors='replace') as file:
             logging.info(f"Reading {ignore_id_file}")
-            for line in read_file_lines(file):
+            for line in iter_file_lines(file):
                 tid = line.removesuffix('\n')
                 self.ignore_ids.add(tid)
     
+    def get_sources(self) -> list[str]:
+        return self.sources
+    
+    def __getstate__(self):
+        # 抓取完成后不再需要原始的API数据，传给子进程时去掉
+        state = self.__dict__.copy()
+        state['prefetched'] = dict()
+        return state
+    
+    def _record_item(self, tids: tuple, base_id: str, d: dict) -> None:
+        name = d.get(self.NAME_FIELD)
+        self.items[tids] = (base_id, None if name is None else str(name))
+    
     def _replace(self, name):
-        return self.replace_map.get(name, name)
+        return self.replace_map.get(' '.join(str(name).split()), name)
+    
+    def fingerprint(self, tid: str|tuple) -> str|None:
+        return repr(self.data.get(tid))
         
     def _call_api(self, api: str):
-        api = api.removeprefix('/')
-        base_url = self.base_url.removesuffix('/')
-        now_timestamp = int(time.time() * 1000)
-        response = requests.get(f"{base_url}/{api}?_={now_timestamp}")
-        response.raise_for_status()
-        return response.json()
+        if api in self.prefetched:
+            return self.prefetched[api]
+        # 优先从本地物品库读取，参见 item_store.load_api
+        return load_api(api, self.base_url)
     
     # Cstone数据的规则集新增的需要实现的接口
     # 对某个API抓取数据
@@ -63,10 +87,15 @@ class CstoneBaseRuleset(BaseRuleset):
         pass
     
     def grab_data_batch(self) -> None:
+        # 没有预取的API先并发获取
+        missing = [api for api in self.apis if api not in self.prefetched]
+        if len(missing) > 1:
+            self.prefetched.update(load_apis(missing, self.base_url))
         for api in self.apis:
             self._grab_data(api)
 
 # NOTE 基础类，根据这个进行修改
+# 只需要提取字段和格式化的规则集可以直接在custom/rulesets中定义，参见 DeclarativeCstoneRuleset
 
 class CstoneChangeMe(CstoneBaseRuleset):
     
@@ -78,10 +107,11 @@ class CstoneChangeMe(CstoneBaseRuleset):
         special_id_file     = 'custom/direct_id/CHANGEME.txt',
         replace_map_file    = 'custom/replace_map/CHANGEME.txt',
         ignore_id_file      = 'custom/ignore/CHANGEME.txt',
-        base_url: str       = 'https://finder.cstone.space', 
+        base_url: str       = config.CSTONE_BASE_URL, 
         auto_grab = True, 
+        prefetched: dict|None = None,
     ) -> None:
-        super().__init__(special_id_file, replace_map_file, ignore_id_file, base_url, auto_grab)
+        super().__init__(special_id_file, replace_map_file, ignore_id_file, base_url, auto_grab, prefetched)
         self.apis = self.APIS
         if auto_grab:
             self.grab_data_batch()
@@ -108,93 +138,6 @@ class CstoneChangeMe(CstoneBaseRuleset):
         stat = self.data[tid]
         return f"{en_str} {cn_str}"
 
-class CstoneMissile(CstoneBaseRuleset):
-    
-    PREFIX_NAME = 'ITEM_NAME'
-    APIS = ['GetMissiles',] 
-    
-    def __init__(
-        self, 
-        special_id_file     = 'custom/direct_id/missile.txt',
-        replace_map_file    = 'custom/replace_map/missile.txt',
-        ignore_id_file      = 'custom/ignore/missile.txt',
-        base_url: str       = 'https://finder.cstone.space', 
-        auto_grab = True, 
-    ) -> None:
-        super().__init__(special_id_file, replace_map_file, ignore_id_file, base_url, auto_grab)
-        self.apis = self.APIS
-        if auto_grab:
-            self.grab_data_batch()
-        
-    def _grab_data(self, api: str):
-        json_data = self._call_api(api)
-        for d in json_data:
-            # 获取基础ID
-            base_id = str(d['ItemCodeName']).upper()
-            if base_id in self.ignore_ids: continue
-            # 处理ID生成可能的ID集合
-            tids = (self.special_id_map.get(base_id),)
-            tids = (
-                f"{self.PREFIX_NAME}{base_id}",
-            ) if tids[0] is None else tids
-            # 收集需要的数据
-            self.data[tids] = {
-                'speed': self._format_int(int(d['LinearSpeed'])),
-                'dmg': self._format_int(int(d['Misdmg'])),
-                'size': (int(d['Size'])),
-                'track': self._replace(d['TrackingSignalType']),
-            }
-            self.id_set.add(tids)
-    
-    def translate(self, tid: str|tuple, cn_str: str|None, en_str: str|None) -> str:
-        if cn_str is None or en_str is None: raise RuntimeError("文本未提供")
-        stat = self.data[tid]
-        return f"{en_str}\\n{cn_str}\\n[S{stat['size']}{stat['track']} 伤害{stat['dmg']} 速度{stat['speed']}]"
-
-class CstoneShipParts(CstoneBaseRuleset):
-    
-    PREFIX_ITEM_NAME = 'ITEM_NAME'
-    # NOTE 跳跃模块和刀片的名称/数据不对，这俩目前也没啥需要改的所以无所谓了
-    APIS = ['GetCoolers', 'GetPowers', 'GetDrives', 'GetShields'] 
-    
-    def __init__(
-        self, 
-        special_id_file     = 'custom/direct_id/ship_parts.txt',
-        replace_map_file    = 'custom/replace_map/ship_parts.txt',
-        ignore_id_file      = 'custom/ignore/ship_parts.txt',
-        base_url: str       = 'https://finder.cstone.space', 
-        auto_grab = True, 
-    ) -> None:
-        super().__init__(special_id_file, replace_map_file, ignore_id_file, base_url, auto_grab)
-        self.apis = self.APIS
-        if auto_grab:
-            self.grab_data_batch()
-        
-    def _grab_data(self, api: str):
-        json_data = self._call_api(api)
-        for d in json_data:
-            base_id = str(d['ItemCodeName']).upper().removesuffix('SCITEM').removesuffix('_')
-            if base_id in self.ignore_ids: continue
-            tids = (self.special_id_map.get(base_id),)
-            tids = (
-                f"{self.PREFIX_ITEM_NAME}{base_id}",
-                f"{self.PREFIX_ITEM_NAME}_{base_id}",
-                f"{self.PREFIX_ITEM_NAME}{base_id}_SCITEM",
-                f"{self.PREFIX_ITEM_NAME}_{base_id}_SCITEM",
-            ) if tids[0] is None else tids
-            self.data[tids] = {
-                'size': d['Size'],                          # S1/2/3/4
-                'class': self._replace(d['ItemClass']),    # 军/民/工, etc
-                'grade': d['Grade'],                        # A/B/C/D
-                'type': self._replace(d['Type']),          # 冷却/发电, etc
-            }
-            self.id_set.add(tids)
-    
-    def translate(self, tid: str|tuple, cn_str: str|None, en_str: str|None) -> str:
-        if cn_str is None or en_str is None: raise RuntimeError("文本未提供")
-        stat = self.data[tid]
-        return f"{en_str} [S{stat['size']}{stat['class']}{stat['grade']} {cn_str}]({stat['type']})"
-    
 class CstoneFoodAndDrink(CstoneBaseRuleset):
     
     # TODO 添加食物效果
@@ -208,10 +151,11 @@ class CstoneFoodAndDrink(CstoneBaseRuleset):
         special_id_file     = 'custom/direct_id/food_and_drink.txt',
         replace_map_file    = 'custom/replace_map/food_and_drink.txt',
         ignore_id_file      = 'custom/ignore/food_and_drink.txt',
-        base_url: str       = 'https://finder.cstone.space', 
+        base_url: str       = config.CSTONE_BASE_URL, 
         auto_grab = True, 
+        prefetched: dict|None = None,
     ) -> None:
-        super().__init__(special_id_file, replace_map_file, ignore_id_file, base_url, auto_grab)
+        super().__init__(special_id_file, replace_map_file, ignore_id_file, base_url, auto_grab, prefetched)
         self.apis = self.APIS
         if auto_grab:
             self.grab_data_batch()
@@ -253,6 +197,7 @@ class CstoneFoodAndDrink(CstoneBaseRuleset):
                 ]
                 tids = tuple(tids)
             
+            self._record_item(tids, base_id, d)
             self.data[tids] = {
                 'hunger': int(d['Hunger']), # 饥饿度
                 'thirst': int(d['Thirst']), # 口渴度
@@ -277,3 +222,112 @@ class CstoneFoodAndDrink(CstoneBaseRuleset):
             result_str += ', '.join(stat['effects'])
             
         return result_str
+
+class DeclarativeCstoneRuleset(CstoneBaseRuleset):
+    
+    """
+    ### 数据文件定义的cstone规则集
+    定义文件(json)的字段：
+    - `name`: 规则集类名
+    - `apis`: 抓取的API
+    - `special_id_file`/`replace_map_file`/`ignore_id_file`: 同CstoneBaseRuleset
+    - `base_id`: `{"field": 物品ID字段, "strip_suffixes": [依次去掉的后缀]}`，结果会转为大写
+    - `id_patterns`: 候选ID，`{base_id}`为基础ID
+    - `fields`: `{名称: {"field": API字段, "transform": [变换]}}`，变换见`TRANSFORMS`
+    - `template`: 输出格式，可以使用fields中的名称以及`{en}`/`{cn}`/`{id}`
+    
+    模板和字段提取在加载定义时编译(参见 CompiledTemplate)，
+    抓取数据时就把物品字段填入模板，翻译时只需要拼接原文
+    """
+    
+    DEFINITION: dict = dict()
+    TEMPLATE: CompiledTemplate
+    # 模板的编译和填充在ruleset_definition中实现
+    VERSION_MODULES = ('ruleset_definition',)
+    
+    def __init__(
+        self, 
+        special_id_file     = None,
+        replace_map_file    = None,
+        ignore_id_file      = None,
+        base_url: str       = config.CSTONE_BASE_URL, 
+        auto_grab = True, 
+        prefetched: dict|None = None,
+    ) -> None:
+        definition = self.DEFINITION
+        super().__init__(
+            special_id_file or definition['special_id_file'], 
+            replace_map_file or definition['replace_map_file'], 
+            ignore_id_file or definition['ignore_id_file'], 
+            base_url, auto_grab, prefetched
+        )
+        transforms = {
+            'int': int,
+            'str': str,
+            'upper': lambda v: str(v).upper(),
+            'format_int': self._format_int,
+            'replace': self._replace,
+        }
+        self.extract = compile_extractor(definition.get('fields', dict()), transforms)
+        self.apis = self.APIS
+        if auto_grab:
+            self.grab_data_batch()
+    
+    def version_inputs(self):
+        # 模板(包括{en}/{cn}的顺序)和字段定义只在类上，translate和各ID的数据都不会随之变化
+        return super().version_inputs(), json.dumps(self.DEFINITION, ensure_ascii=False, sort_keys=True)
+    
+    def __getstate__(self):
+        # 提取函数是闭包，无法传给子进程，翻译时也不需要
+        state = super().__getstate__()
+        state.pop('extract', None)
+        return state
+        
+    def _grab_data(self, api: str):
+        base_spec = self.DEFINITION['base_id']
+        suffixes = base_spec.get('strip_suffixes', [])
+        patterns = self.DEFINITION['id_patterns']
+        json_data = self._call_api(api)
+        for d in json_data:
+            base_id = str(d[base_spec['field']]).upper()
+            for suffix in suffixes:
+                base_id = base_id.removesuffix(suffix)
+            if base_id in self.ignore_ids: continue
+            special_id = self.special_id_map.get(base_id)
+            tids = (special_id,) if special_id is not None else tuple(p.format(base_id=base_id) for p in patterns)
+            self._record_item(tids, base_id, d)
+            self.data[tids] = self.TEMPLATE.bind(self.extract(d))
+            self.id_set.add(tids)
+    
+    def translate(self, tid: str|tuple, cn_str: str|None, en_str: str|None) -> str:
+        if cn_str is None or en_str is None: raise RuntimeError("文本未提供")
+        return self.TEMPLATE.render(self.data[tid], (en_str, cn_str, tid if isinstance(tid, str) else tid[0]))
+
+def load_ruleset_definition(path: str, module: str = __name__) -> type[DeclarativeCstoneRuleset]:
+    """读取定义文件，生成DeclarativeCstoneRuleset的子类"""
+    with open(path, 'r', encoding='utf-8') as file:
+        definition = json.load(file)
+    return type(definition['name'], (DeclarativeCstoneRuleset,), {
+        'APIS': list(definition['apis']),
+        'DEFINITION': definition,
+        'TEMPLATE': CompiledTemplate(definition['template']),
+        '__module__': module,
+        '__doc__': definition.get('comment'),
+    })
+
+def load_ruleset_definitions(folder: str = config.RULESET_DEFINITION_DIR, module: str = __name__) -> dict[str, type[DeclarativeCstoneRuleset]]:
+    rulesets = dict()
+    if not os.path.isdir(folder): return rulesets
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith('.json'): continue
+        # 一个定义文件有误不影响其他规则集
+        try:
+            ruleset_cls = load_ruleset_definition(os.path.join(folder, filename), module)
+        except Exception as e:
+            logging.warning(f"[REGISTRY_EXECPTION] {filename} 读取失败: {e}")
+            continue
+        rulesets[ruleset_cls.__name__] = ruleset_cls
+    return rulesets
+
+# custom/rulesets中定义的规则集(CstoneMissile, CstoneShipParts等)，加入模块命名空间以便导入和跨进程传递
+globals().update(load_ruleset_definitions())
@@ -1,127 +1,485 @@
-import re, json
+import os, re, sys, json, time
 import logging
-from typing import Iterable, Callable
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Callable, TYPE_CHECKING
 from typing import Type
 from base_ruleset import BaseRuleset
 
 import config
-from utils import read_file_lines
+from text_store import TextStore
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from id_resolver import IdResolver
+from output_writer import OutputVariant, BufferedWriter, BODY_ENCODING
+from output_validator import OutputValidator
+if TYPE_CHECKING:
+    from build_profile import BuildProfiler
+
+def is_cstone_ruleset(ruleset_cls: Type[BaseRuleset]) -> bool:
+    # 没有导入过cstone_ruleset时不可能传入cstone规则集，避免为此导入requests
+    cstone = sys.modules.get('cstone_ruleset')
+    return cstone is not None and issubclass(ruleset_cls, cstone.CstoneBaseRuleset)
+
+def prefetch_apis(rulesets: list[Type[BaseRuleset]], text_dir: str = config.TEXT_FILE_DIR) -> dict:
+    """
+    获取所有cstone规则集需要的API，返回`{api: json_data}`
+    未过期的从本地物品库中`text_dir`对应的版本读取，其余并发抓取后写入该版本
+    """
+    apis = [api for cls in rulesets if is_cstone_ruleset(cls) for api in cls.APIS]
+    if len(apis) == 0: return dict()
+    from item_store import load_apis, item_version
+    return load_apis(apis, config.CSTONE_BASE_URL, item_version(text_dir))
+
+def instantiate_ruleset(ruleset_cls: Type[BaseRuleset], api_data: dict) -> BaseRuleset:
+    if is_cstone_ruleset(ruleset_cls):
+        return ruleset_cls(prefetched=api_data)
+    return ruleset_cls()
+
+def translate_batch(
+    translate: Callable[[str|tuple, str|None, str|None], str], 
+    tasks: list[tuple[str|tuple, str|None, str|None]]
+) -> tuple[list[tuple[bool, str]], float]:
+    """执行一批翻译，返回每项的(是否成功, 结果或异常信息)和耗时，可以在子进程中运行"""
+    start = time.perf_counter()
+    results = list()
+    for id, cn_str, en_str in tasks:
+        try:
+            results.append((True, translate(id, cn_str, en_str)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results, time.perf_counter() - start
 
 class GenerationManager():
     
-    def __init__(self, en_file, cn_file, ref_file) -> None:
-        self.id_list = []
-        self.id_map = dict()
-        self.id_set = set()
-        self.text_data = {
-            'en': dict(),
-            'cn': dict(),
-            'ref': dict(),
-        }
-        file_map = {
-            'en': en_file,
-            'cn': cn_file,
-            'ref': ref_file,
-        }
-        for key, filename in file_map.items():
-            with open(filename, 'r', encoding=config.ENCODE, errors='replace') as file:
-                logging.info(f"Reading {filename}")
-                for line in read_file_lines(file):
-                    tid, _, text = line.partition('=')
-                    tid = tid.removeprefix('\ufeff')
-                    text = text.removesuffix('\n')
-                    self.text_data[key][tid] = text
-                    if tid not in self.id_set:
-                        self.id_list.append(tid)
-                        self.id_set.add(tid)
-                        self.id_map[tid.upper()] = tid
+    def __init__(
+        self, en_file, cn_file, ref_file, 
+        use_snapshot: bool = config.SNAPSHOT_CACHE, 
+        incremental: bool = config.INCREMENTAL_BUILD,
+        validation: str = config.OUTPUT_VALIDATION,
+        profiler: 'BuildProfiler|None' = None,
+        cache_dir: str|None = None
+    ) -> None:
+        # 构建分析，None时不做任何额外处理
+        self.profiler = profiler
+        self.text_dir = os.path.dirname(en_file)
+        # 文本按列存储，ID只保存一份，参见 TextStore
+        with self.__section('parse'):
+            self.store = TextStore.from_files({
+                'en': en_file,
+                'cn': cn_file,
+                'ref': ref_file,
+            }, use_snapshot)
 
+        # 以下均以ID在store中的下标为键
         self.processed = set()
+        self.owners = dict()    # 每个ID由哪个规则集生成
+        self.alternates = dict()  # 同一个ID被多个规则集声明时，优先级较低的 [(规则集, 源ID)]
         self.result_data = dict()
+        # 同时构建多个版本时各自使用独立的缓存目录(参见 batch_build.py)
+        def cache_path(path: str) -> str:
+            return path if cache_dir is None else os.path.join(cache_dir, os.path.basename(path))
+        self.manifest = BuildManifest(cache_path(config.BUILD_MANIFEST_PATH)) if incremental else None
+        self.resolver = IdResolver(self.store, cache_path=cache_path(config.RESOLVER_CACHE_PATH))
+        self.report_path = cache_path(config.BUILD_REPORT_PATH)
+        self.stats = BuildStats()
+        self.validation = validation
+        # 已应用的规则集实例和预取的API数据，常驻模式重建规则集时使用
+        self.rulesets: list[BaseRuleset] = list()
+        self.api_data = dict()
+        self.reuse = dict()     # 重建时未变化的规则集可以复用的结果 {idx: (规则集名, 结果)}
+        # 保留上次生成的各输出文件编码后的行，只重新生成变化的ID (输出列表, [[行]])
+        self.keep_rendered = False
+        self.rendered: tuple[list[OutputVariant], list[list[bytes]]]|None = None
+        
+    def __section(self, name: str):
+        return self.profiler.section(name) if self.profiler is not None else nullcontext()
+        
+    @property
+    def id_list(self) -> list[str]:
+        return self.store.ids
         
     def apply_single_ruleset(self, ruleset: BaseRuleset):
-        self.process(ruleset.get_ids(), ruleset.translate)
+        self.apply_ruleset_instances([ruleset])
+            
+    def prefetch(self, rulesets: list[Type[BaseRuleset]]) -> dict:
+        return prefetch_apis(rulesets, self.text_dir)
+    
+    def create_ruleset(self, ruleset_cls: Type[BaseRuleset], api_data: dict) -> BaseRuleset:
+        return instantiate_ruleset(ruleset_cls, api_data)
+            
+    def create_rulesets(self, rulesets: list[Type[BaseRuleset]], api_data: dict) -> list[BaseRuleset]:
+        """在线程池中并发创建规则集(主要是读取文件)，返回顺序与传入顺序一致"""
+        def create(ruleset_cls):
+            start = time.perf_counter()
+            with self.__section(f"{ruleset_cls.__name__}.init"):
+                ruleset = self.create_ruleset(ruleset_cls, api_data)
+            return ruleset, time.perf_counter() - start
+        if self.profiler is not None:
+            # cProfile只记录当前线程
+            created = [create(ruleset_cls) for ruleset_cls in rulesets]
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(config.RULESET_WORKERS, len(rulesets)))) as executor:
+                created = list(executor.map(create, rulesets))
+        for ruleset, seconds in created:
+            self.stats.ruleset(type(ruleset).__name__).init_seconds += seconds
+        return [ruleset for ruleset, _ in created]
             
     def apply_rulesets(self, rulesets: list[Type[BaseRuleset]]):
-        for ruleset_cls in rulesets:
-            logging.info(f"Applying ruleset {ruleset_cls.__name__}...")
-            ruleset = ruleset_cls()
-            self.apply_single_ruleset(ruleset)
-            logging.info(f"Apply ruleset {ruleset_cls.__name__} finished.")
+        with self.__section('prefetch'):
+            api_data = self.prefetch(rulesets)
+        self.api_data.update(api_data)
+        logging.info(f"Creating rulesets {', '.join(cls.__name__ for cls in rulesets)}...")
+        self.apply_ruleset_instances(self.create_rulesets(rulesets, api_data))
+    
+    def apply_ruleset_instances(self, rulesets: list[BaseRuleset], executor: str = config.TRANSLATE_EXECUTOR):
+        """
+        应用多个规则集
+        
+        先按列表顺序(即优先级)分配ID，同一个ID只由第一个声明它的规则集生成，
+        被多个规则集声明的ID会记录在统计中，然后各规则集的翻译并行执行
+        """
+        self.rulesets.extend(rulesets)
+        # 改写文本的规则集在生成输出时才调用
+        rulesets = [ruleset for ruleset in rulesets if not ruleset.rewrites_text]
+        with self.__section('claim'):
+            for ruleset in rulesets:
+                ruleset.bind(self.store)
+            jobs = [(ruleset, self.claim(ruleset.get_ids(), ruleset)) for ruleset in rulesets]
+        self.run_jobs([(ruleset.translate, ruleset, tasks) for ruleset, tasks in jobs], executor)
+        for ruleset in rulesets:
+            logging.info(f"Apply ruleset {type(ruleset).__name__} finished.")
     
-    def process(self, ids: Iterable[str], translate: Callable[[str|tuple, str|None, str|None], str]):
-        for id in ids:
-            tid = self.get_id(id)
-            logging.info(tid)
-            if tid not in self.id_set: 
-                logging.warning(f"[PROC_MISSINGID] {tid}({id}) not found in id set")
+    def rebuild_rulesets(self, names: Iterable[str]) -> set[int]:
+        """
+        按类重新创建指定名称的规则集，再按原来的顺序重新分配所有ID，返回结果有变化的ID下标
+        
+        其他规则集仍由同一个实例声明同一个ID时直接复用上次的结果，
+        只有重建的规则集和因此获得ID的规则集需要调用`translate`
+        """
+        names = set(names)
+        rulesets = [
+            self.create_ruleset(type(ruleset), self.api_data) if type(ruleset).__name__ in names else ruleset
+            for ruleset in self.rulesets
+        ]
+        result_data, owners, alternates = self.result_data, self.owners, self.alternates
+        self.reuse = {idx: (owners.get(idx), result) for idx, result in result_data.items() if owners.get(idx) not in names}
+        self.processed = set()
+        self.owners = dict()
+        self.alternates = dict()
+        self.result_data = dict()
+        self.rulesets = list()
+        # 缺失文本的计数与规则集无关，沿用上次生成的统计
+        stats, self.stats = self.stats, BuildStats()
+        self.stats.fallback, self.stats.empty = stats.fallback, stats.empty
+        try:
+            self.apply_ruleset_instances(rulesets)
+        finally:
+            self.reuse = dict()
+        changed = {
+            idx for idx in result_data.keys() | self.result_data.keys()
+            if result_data.get(idx) != self.result_data.get(idx) or owners.get(idx) != self.owners.get(idx)
+        }
+        # 被重建的规则集实例已经替换，涉及它们的备选结果都需要重新生成
+        changed.update(idx for idx in alternates.keys() | self.alternates.keys() if alternates.get(idx) != self.alternates.get(idx))
+        # 改写文本的规则集影响所有输出
+        if any(ruleset.rewrites_text and type(ruleset).__name__ in names for ruleset in rulesets):
+            changed = set(range(len(self.store.ids)))
+        return changed
+    
+    def process(
+        self, 
+        ids: Iterable[str], 
+        translate: Callable[[str|tuple, str|None, str|None], str], 
+        ruleset: BaseRuleset|None = None
+    ):
+        self.run_jobs([(translate, ruleset, self.claim(ids, ruleset))], executor='serial')
+        
+    def claim(self, ids: Iterable[str|tuple], ruleset: BaseRuleset|None = None) -> list[tuple[str|tuple, int, str|None]]:
+        """
+        为规则集分配ID，已被分配的ID跳过，增量构建可复用的结果直接写入
+        返回需要调用`translate`的任务 [(源ID, 下标, 增量构建指纹)]
+        """
+        cn_column = self.store.columns['cn']
+        en_column = self.store.columns['en']
+        name = type(ruleset).__name__ if ruleset is not None else 'anonymous'
+        stats = self.stats.ruleset(name)
+        tasks = list()
+        # 先批量解析所有候选ID
+        resolved = self.resolver.resolve_all(ids)
+        for id, (idx, pattern) in resolved.items():
+            stats.claimed += 1
+            tracing = self.stats.tracing()
+            if idx is None: 
+                stats.missing += 1
+                stats.sample('PROC_MISSINGID', str(id))
+                if tracing: self.stats.trace(f"[PROC_MISSINGID] {id} not found in id set")
                 continue
-            elif tid in self.processed:
-                logging.info(f"{tid} processed, skip")
+            stats.patterns[pattern] = stats.patterns.get(pattern, 0) + 1
+            tid = self.store.ids[idx]
+            if idx in self.processed:
+                stats.skipped += 1
+                self.stats.conflict(tid, self.owners.get(idx, 'unknown'), name)
+                if ruleset is not None:
+                    self.alternates.setdefault(idx, []).append((ruleset, id))
+                if tracing: self.stats.trace(f"{tid} processed, skip")
                 continue
+            self.processed.add(idx)
+            self.owners[idx] = name
+            reused = self.reuse.get(idx)
+            if reused is not None and reused[0] == name:
+                self.result_data[idx] = reused[1]
+                stats.reused += 1
+                continue
+            key = None
+            if self.manifest is not None and ruleset is not None:
+                key = self.manifest.key(ruleset, id, cn_column[idx], en_column[idx])
+                result = self.manifest.lookup(tid, key)
+                if result is not None:
+                    self.result_data[idx] = result
+                    stats.reused += 1
+                    continue
+            tasks.append((id, idx, key))
+        return tasks
+    
+    def run_jobs(
+        self, 
+        jobs: list[tuple[Callable, BaseRuleset|None, list[tuple[str|tuple, int, str|None]]]], 
+        executor: str = config.TRANSLATE_EXECUTOR
+    ):
+        """执行各规则集的翻译任务并写入结果，启用构建分析时总是在当前进程中逐个计时执行"""
+        cn_column = self.store.columns['cn']
+        en_column = self.store.columns['en']
+        total = sum(len(tasks) for _, _, tasks in jobs)
+        if executor == 'auto':
+            executor = 'process' if total >= config.TRANSLATE_PROCESS_THRESHOLD else 'serial'
+        if self.profiler is not None:
+            executor = 'profile'
+        
+        batches = list()
+        for translate, _, tasks in jobs:
+            batches.append((translate, [(id, cn_column[idx], en_column[idx]) for id, idx, _ in tasks]))
+        if executor == 'process' and len(batches) > 0:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=max(1, min(config.RULESET_WORKERS, len(batches)))) as pool:
+                futures = [pool.submit(translate_batch, translate, items) for translate, items in batches]
+                outputs = [future.result() for future in futures]
+        elif executor == 'profile':
+            outputs = list()
+            for (translate, items), (_, ruleset, tasks) in zip(batches, jobs):
+                name = type(ruleset).__name__ if ruleset is not None else 'anonymous'
+                resolved = {id: self.store.ids[idx] for id, idx, _ in tasks}
+                with self.profiler.section(f"{name}.translate"):
+                    outputs.append(translate_batch(self.profiler.timed(name, translate, resolved), items))
+        else:
+            outputs = [translate_batch(translate, items) for translate, items in batches]
+        
+        for (_, ruleset, tasks), (results, seconds) in zip(jobs, outputs):
+            stats = self.stats.ruleset(type(ruleset).__name__ if ruleset is not None else 'anonymous')
+            stats.process_seconds += seconds
+            for (id, idx, key), (ok, result) in zip(tasks, results):
+                tid = self.store.ids[idx]
+                tracing = self.stats.tracing()
+                if not ok:
+                    stats.failed += 1
+                    stats.sample('PROC_EXECPTION', f"{tid}: {result}")
+                    if tracing: self.stats.trace(f"[PROC_EXECPTION] {tid}: {result}")
+                    self.__fall_back(idx)
+                    continue
+                self.result_data[idx] = result
+                if key is not None:
+                    self.manifest.record(tid, key, result)
+                stats.translated += 1
+                if tracing: self.stats.trace(f"{id} -> {tid}: {result}")
+            
+    def __fall_back(self, idx: int):
+        """
+        所属规则集翻译失败时，按优先级依次尝试同样声明了该ID的其他规则集，成功的规则集成为新的所属规则集
+        都失败时取消分配，之后处理的规则集仍可以声明该ID
+        """
+        alternates = self.alternates.get(idx, [])
+        while len(alternates):
+            ruleset, src_id = alternates.pop(0)
+            name = type(ruleset).__name__
             try:
-                self.result_data[tid] = translate(id, self.text_data['cn'][tid], self.text_data['en'][tid])
-                logging.info(f"{id} -> {tid}: {self.result_data[tid]}")
-                self.processed.add(id)
+                result = ruleset.translate(src_id, self.store.columns['cn'][idx], self.store.columns['en'][idx])
             except Exception as e:
-                logging.warning(f"[PROC_EXECPTION] {e}")
+                self.stats.ruleset(name).failed += 1
+                self.stats.ruleset(name).sample('PROC_EXECPTION', f"{self.store.ids[idx]}: {e}")
                 continue
-            
-    def __proc_missing_data(self, tid):
+            self.result_data[idx] = result
+            self.owners[idx] = name
+            self.stats.ruleset(name).translated += 1
+            if self.stats.tracing(): self.stats.trace(f"{src_id} -> {self.store.ids[idx]}: {result} (fallback to {name})")
+            break
+        else:
+            self.processed.discard(idx)
+            self.owners.pop(idx, None)
+        if len(alternates) == 0:
+            self.alternates.pop(idx, None)
+
+    def __proc_missing_data(self, idx):
         # NOTE 对于缺省值的处理
-        if tid in self.text_data['ref']:
-            return self.text_data['ref'][tid]
-        elif tid in self.text_data['cn']:
-            return self.text_data['cn'][tid]
-        elif tid in self.text_data['en']:
-            return self.text_data['en'][tid]
+        for lang in ('ref', 'cn', 'en'):
+            text = self.store.columns[lang][idx]
+            if text is not None:
+                return text
         return None
             
     def generate(self, output_path, suffix_files: str|list|None = None, suffix_data: dict|None = None):
-        with open(output_path, 'w', encoding=config.ENCODE, errors='replace') as file:
-            logging.info(f"Writing {output_path}")
-            for id in self.id_list:
-                tid = self.get_id(id)
-                if tid is None:
-                    logging.warning(f"[GEN_MISSINGID] {tid} not found in id set")
-                    continue
-                if tid in self.result_data.keys(): 
-                    file.write(f"{tid}={self.result_data[tid]}\n")
-                elif tid in self.text_data['ref'].keys():
-                    file.write(f"{tid}={self.text_data['ref'][tid]}\n")
-                else:
-                    text = self.__proc_missing_data(tid)
-                    logging.warning(f"[GEN_MISSINGID] {tid} not found in result or reference, using {text} instead")
-                    if text is None:
-                        logging.warning(f"[GEN_MISSINGID_EMPTY] {tid} not found anywhere")
-                        continue
-                    file.write(f"{tid}={text}\n")
-            if suffix_files is not None:
-                if isinstance(suffix_files, str):
-                    suffix_files = [suffix_files]
-                for suffix_file in suffix_files:
-                    try:
-                        with open(suffix_file, 'r', encoding=config.ENCODE, errors='replace') as suffix:
-                            logging.info(f"Reading {suffix_file}")
-                            file.write(suffix.read())
-                    except Exception as e:
-                        logging.warning(f"[GEN_EXECPTION] {e}")
-            if suffix_data is not None:
-                for tid, text in suffix_data.items():
-                    file.write(f"{tid}={text}\n")
+        self.generate_variants([OutputVariant(output_path, None, suffix_files, suffix_data)])
+        
+    def __variant_text(self, idx: int, variant: OutputVariant) -> str|None:
+        """不包含该ID所属规则集的输出，使用其中优先级最高的其他规则集"""
+        for ruleset, src_id in self.alternates.get(idx, ()):
+            if not variant.includes(type(ruleset).__name__): continue
+            try:
+                return ruleset.translate(src_id, self.store.columns['cn'][idx], self.store.columns['en'][idx])
+            except Exception as e:
+                logging.warning(f"[GEN_EXECPTION] {self.store.ids[idx]}: {e}")
+        return None
+    
+    def validate(self, variants: list[OutputVariant]):
+        """校验规则集结果和后缀数据，参见 OutputValidator"""
+        start = time.perf_counter()
+        issues = OutputValidator(self.store).validate(self.result_data, variants, self.owners)
+        for issue in issues:
+            self.stats.validation_issue(issue.kind, repr(issue))
+        logging.info(f"Validated {len(self.result_data)} results in {time.perf_counter() - start:.3f}s, {len(issues)} issues")
+        if len(issues) and self.validation == 'error':
+            self.stats.log_summary()
+            raise ValueError(f"[VALIDATE_ERROR] 输出校验发现{len(issues)}个问题")
+    
+    def __rewriters(self, variants: list[OutputVariant]) -> list[list[BaseRuleset]]:
+        """各输出文件包含的改写文本的规则集"""
+        rewriters = [ruleset for ruleset in self.rulesets if ruleset.rewrites_text]
+        return [[ruleset for ruleset in rewriters if variant.includes(type(ruleset).__name__)] for variant in variants]
+    
+    def __render(self, idx: int, variants: list[OutputVariant], rewriters: list[list[BaseRuleset]], count: bool = True) -> list[str]:
+        """
+        生成一个ID在各输出文件中的行，不输出时为空字符串，`count`为真时计入统计
+        `rewriters`为各输出文件依次改写文本的规则集(参见 BaseRuleset.rewrite)
+        """
+        tid = self.store.ids[idx]
+        result = self.result_data.get(idx)
+        text = self.store.columns['ref'][idx]
+        if text is None:
+            text = self.__proc_missing_data(idx)
+            if text is None and result is None:
+                if not count: return [''] * len(variants)
+                self.stats.empty += 1
+                if self.stats.tracing(): self.stats.trace(f"[GEN_MISSINGID_EMPTY] {tid} not found anywhere")
+                return [''] * len(variants)
+            if result is None and count:
+                self.stats.fallback += 1
+                if self.stats.tracing(): self.stats.trace(f"[GEN_MISSINGID] {tid} not found in result or reference, using {text} instead")
+        owner = self.owners.get(idx)
+        lines = list()
+        for variant, rewrite in zip(variants, rewriters):
+            line = text
+            if result is not None:
+                if variant.includes(owner):
+                    line = result
+                elif idx in self.alternates:
+                    line = self.__variant_text(idx, variant) or text
+            if line is None:
+                lines.append('')
+                continue
+            for ruleset in rewrite:
+                line = ruleset.rewrite(line)
+            lines.append(f"{tid}={line}\n")
+        return lines
+    
+    def __write_suffix(self, variant: OutputVariant, writer: BufferedWriter):
+        for suffix_file in variant.suffix_files:
+            try:
+                with open(suffix_file, 'r', encoding=config.ENCODE, errors='replace') as suffix:
+                    logging.info(f"Reading {suffix_file}")
+                    writer.write(suffix.read())
+            except Exception as e:
+                logging.warning(f"[GEN_EXECPTION] {e}")
+        for tid, text in variant.suffix_data.items():
+            writer.write(f"{tid}={text}\n")
+    
+    def __write_variants(self, variants: list[OutputVariant]):
+        bodies = [list() for _ in variants]
+        writers = [BufferedWriter(variant.output_path) for variant in variants]
+        rewriters = self.__rewriters(variants)
+        try:
+            for idx in range(len(self.store.ids)):
+                lines = self.__render(idx, variants, rewriters)
+                for writer, line in zip(writers, lines):
+                    writer.write(line)
+                if self.keep_rendered:
+                    for body, line in zip(bodies, lines):
+                        body.append(line.encode(BODY_ENCODING, 'replace'))
+            for variant, writer in zip(variants, writers):
+                self.__write_suffix(variant, writer)
+                writer.commit()
+        except BaseException:
+            for writer in writers:
+                writer.abort()
+            self.rendered = None
+            raise
+        self.rendered = (variants, bodies) if self.keep_rendered else None
+    
+    def __patch_variants(self, variants: list[OutputVariant], bodies: list[list[bytes]], changed: set[int]):
+        """只重新生成变化的ID的行，没有任何行变化的输出文件不重写"""
+        dirty = [False] * len(variants)
+        rewriters = self.__rewriters(variants)
+        for idx in changed:
+            for i, line in enumerate(self.__render(idx, variants, rewriters, count=False)):
+                line = line.encode(BODY_ENCODING, 'replace')
+                if bodies[i][idx] != line:
+                    bodies[i][idx] = line
+                    dirty[i] = True
+        logging.info(f"Rendered {len(changed)} changed ids")
+        for variant, body, is_dirty in zip(variants, bodies, dirty):
+            if not is_dirty: continue
+            writer = BufferedWriter(variant.output_path)
+            try:
+                writer.write_bytes(b''.join(body))
+                self.__write_suffix(variant, writer)
+                writer.commit()
+            except BaseException:
+                writer.abort()
+                self.rendered = None
+                raise
+    
+    def generate_variants(self, variants: list[OutputVariant], changed: set[int]|None = None):
+        """
+        一次遍历生成多个输出文件，各输出可以使用不同的规则集和后缀数据
+        
+        `keep_rendered`为真时保留生成的行，之后对同一组输出传入`changed`(参见 rebuild_rulesets)
+        只重新生成这些ID的行
+        """
+        if self.validation != 'off':
+            with self.__section('validate'):
+                self.validate(variants)
+        rendered = self.rendered if self.rendered is not None and self.rendered[0] is variants else None
+        with self.__section('generate'):
+            if changed is None or rendered is None:
+                self.__write_variants(variants)
+            else:
+                self.__patch_variants(variants, rendered[1], changed)
+        if self.manifest is not None:
+            self.manifest.save()
+        self.resolver.save()
+        self.stats.log_summary()
+        self.stats.write_report(self.report_path)
 
-    def get_id(self, src_id: str|tuple) -> str|None:
+    def get_index(self, src_id: str|tuple) -> int|None:
         if isinstance(src_id, str):
-            return self.id_map.get(src_id.upper())
-        elif isinstance(src_id, tuple):
-            for id in src_id:
-                result = self.get_id(id)
-                if result is not None: return result
-        return None
+            return self.store.find(src_id)
+        return self.resolver.resolve(src_id)
+
+    def get_id(self, src_id: str|tuple) -> str|None:
+        idx = self.get_index(src_id)
+        return None if idx is None else self.store.ids[idx]
     
     def get_text(self, tid: str, src: str = 'ref'):
-        tid_s = self.get_id(tid)
-        if tid_s is None:
+        idx = self.get_index(tid)
+        if idx is None:
             logging.warning(f"[GETTEXT_MISSINGID] {tid} not found")
-            return self.text_data[src].get(tid)
-        return self.text_data[src].get(tid_s)
\ No newline at end of file
+            return None
+        return self.store.text(idx, src)
\ No newline at end of file
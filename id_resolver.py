@@ -0,0 +1,96 @@
+import os, marshal, hashlib
+import logging
+from typing import Iterable
+
+import config
+from text_store import TextStore
+from utils import iter_file_lines
+
+# 解析方式的标记
+PATTERN_ALIAS = 'alias'
+
+class IdResolver():
+
+    """
+    规则集ID的批量解析
+
+    规则集的ID可以是字符串或候选ID元组，按顺序取第一个在文本中存在的ID
+    所有候选都不存在时，按别名文件替换候选中的片段后重试(例如`QDRV`/`QRDV`)
+    解析结果记录匹配的是第几个候选(`candidate<n>`)或别名，并按文本指纹缓存到磁盘
+    """
+
+    def __init__(
+        self,
+        store: TextStore,
+        alias_file: str = config.ID_ALIAS_FILE,
+        cache_path: str = config.RESOLVER_CACHE_PATH
+    ) -> None:
+        self.store = store
+        self.cache_path = cache_path
+        self.aliases: list[tuple[str, str]] = list()
+        if alias_file is not None and os.path.exists(alias_file):
+            with open(alias_file, 'r', encoding=config.ENCODE, errors='replace') as file:
+                for line in iter_file_lines(file):
+                    src, p, dst = line.partition('=')
+                    if src.startswith('#') or p != '=': continue
+                    self.aliases.append((src.upper(), dst.upper()))
+        self.cache_key = None
+        if store.fingerprint is not None:
+            self.cache_key = hashlib.sha1(repr((store.fingerprint, self.aliases)).encode('utf-8')).hexdigest()
+        # {src_id: (idx, pattern)}，未解析的idx为-1
+        self.cache: dict = dict()
+        self.dirty = False
+        self.__load()
+
+    def __load(self) -> None:
+        if self.cache_key is None or not os.path.exists(self.cache_path): return
+        try:
+            with open(self.cache_path, 'rb') as file:
+                key, cache = marshal.load(file)
+            if key == self.cache_key:
+                self.cache = cache
+        except Exception as e:
+            logging.warning(f"[RESOLVER_EXECPTION] {self.cache_path} 读取失败: {e}")
+
+    def save(self) -> None:
+        if self.cache_key is None or not self.dirty: return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'wb') as file:
+                marshal.dump((self.cache_key, self.cache), file)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except Exception as e:
+            logging.warning(f"[RESOLVER_EXECPTION] {self.cache_path} 写入失败: {e}")
+
+    def __resolve(self, src_id: str|tuple) -> tuple[int, str]:
+        index = self.store.index
+        candidates = (src_id,) if isinstance(src_id, str) else src_id
+        for pos, candidate in enumerate(candidates):
+            if candidate is None: continue
+            idx = index.get(candidate.upper())
+            if idx is not None: return idx, f"candidate{pos}"
+        for candidate in candidates:
+            if candidate is None: continue
+            candidate = candidate.upper()
+            for src, dst in self.aliases:
+                if src not in candidate: continue
+                idx = index.get(candidate.replace(src, dst))
+                if idx is not None: return idx, PATTERN_ALIAS
+        return -1, ''
+
+    def resolve(self, src_id: str|tuple) -> int|None:
+        return self.resolve_all((src_id,))[src_id][0]
+
+    def resolve_all(self, ids: Iterable[str|tuple]) -> dict[str|tuple, tuple[int|None, str]]:
+        """一次解析所有ID，返回`{src_id: (idx, pattern)}`，未解析的idx为None"""
+        result = dict()
+        for src_id in ids:
+            entry = self.cache.get(src_id)
+            if entry is None:
+                entry = self.cache[src_id] = self.__resolve(src_id)
+                self.dirty = True
+            idx, pattern = entry
+            result[src_id] = (idx if idx >= 0 else None, pattern)
+        return result
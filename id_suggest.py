@@ -0,0 +1,228 @@
+import os, re, math, time, heapq
+import argparse
+import logging
+from difflib import SequenceMatcher
+
+import config
+import ruleset_registry
+from base_ruleset import BaseRuleset
+from text_store import TextStore
+
+WORD_RE = re.compile(r'[0-9a-z]+')
+SCITEM_SUFFIX = '_SCITEM'
+
+def strip_id(tid: str, prefixes: list[str]) -> str:
+    """转为大写并去掉前缀和`_SCITEM`后缀，如`item_Name_QRDV_ACAS_S01_LightFire` -> `QRDV_ACAS_S01_LIGHTFIRE`"""
+    key = tid.upper()
+    for prefix in prefixes:
+        if key.startswith(prefix):
+            key = key[len(prefix):]
+            break
+    return key.strip('_').removesuffix(SCITEM_SUFFIX)
+
+def id_grams(key: str) -> set[str]:
+    """ID的分词(按`_`)和字符三元组"""
+    grams = {f"t:{token}" for token in key.split('_') if token}
+    padded = f"_{key}_"
+    grams.update(f"g:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return grams
+
+def name_grams(text: str|None) -> set[str]:
+    """英文名称的单词"""
+    if not text: return set()
+    return {f"w:{word}" for word in WORD_RE.findall(text.lower())}
+
+class IdIndex():
+
+    """
+    ID的n-gram倒排索引
+
+    每个ID的文档为去掉前缀后的分词、字符三元组和en文本的单词，按TF-IDF余弦相似度初筛，
+    再对得分最高的`rerank`个候选计算ID的编辑相似度，两者的平均作为最终得分
+    出现过于频繁的n-gram(如`ITE`)不参与初筛，查询只需要遍历少量倒排列表
+    """
+
+    def __init__(
+        self,
+        store: TextStore,
+        prefixes: list[str] = config.SUGGEST_ID_PREFIXES,
+        max_df: float = config.SUGGEST_MAX_DF,
+        rerank: int = config.SUGGEST_RERANK
+    ) -> None:
+        start = time.perf_counter()
+        self.prefixes = sorted((prefix.upper() for prefix in prefixes), key=len, reverse=True)
+        self.rerank = rerank
+        self.doc_idx: list[int] = list()     # 文档 -> store中的下标
+        self.keys: list[str] = list()
+        self.postings: dict[str, list[int]] = dict()
+        en_column = store.columns['en']
+        prefix_tuple = tuple(self.prefixes)
+        for idx, tid in enumerate(store.ids):
+            if prefix_tuple and not tid.upper().startswith(prefix_tuple): continue
+            key = strip_id(tid, self.prefixes)
+            doc = len(self.doc_idx)
+            self.doc_idx.append(idx)
+            self.keys.append(key)
+            for gram in id_grams(key) | name_grams(en_column[idx]):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    self.postings[gram] = [doc]
+                else:
+                    posting.append(doc)
+        count = len(self.doc_idx)
+        self.idf = {gram: math.log(1 + count / len(posting)) for gram, posting in self.postings.items()}
+        squares = [0.0] * count
+        for gram, posting in self.postings.items():
+            weight = self.idf[gram] ** 2
+            for doc in posting:
+                squares[doc] += weight
+        self.norms = [math.sqrt(square) or 1.0 for square in squares]
+        self.max_postings = max(int(count * max_df), 100)
+        logging.info(f"Indexed {count} ids, {len(self.postings)} grams in {time.perf_counter() - start:.2f}s")
+
+    def query(
+        self,
+        base_id: str,
+        name: str|None = None,
+        top_n: int = config.SUGGEST_TOP_N,
+        exclude: set[int]|None = None,
+        min_score: float = config.SUGGEST_MIN_SCORE
+    ) -> list[tuple[float, int]]:
+        """返回最相似的ID `[(得分, store中的下标)]`，`exclude`中的下标不参与"""
+        key = strip_id(base_id, self.prefixes)
+        grams = id_grams(key) | name_grams(name)
+        query_norm = math.sqrt(sum(self.idf.get(gram, 0.0) ** 2 for gram in grams)) or 1.0
+        dots: dict[int, float] = dict()
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None or len(posting) > self.max_postings: continue
+            weight = self.idf[gram] ** 2
+            for doc in posting:
+                dots[doc] = dots.get(doc, 0.0) + weight
+        exclude = exclude or set()
+        candidates = heapq.nlargest(
+            self.rerank,
+            ((doc, dot) for doc, dot in dots.items() if self.doc_idx[doc] not in exclude),
+            key=lambda item: item[1] / self.norms[item[0]]
+        )
+        results = list()
+        for doc, dot in candidates:
+            cosine = dot / (query_norm * self.norms[doc])
+            ratio = SequenceMatcher(None, key, self.keys[doc], autojunk=False).ratio()
+            score = (cosine + ratio) / 2
+            if score >= min_score:
+                results.append((score, self.doc_idx[doc]))
+        results.sort(reverse=True)
+        return results[:top_n]
+
+class Suggestion():
+
+    """一个找不到ID的物品和推荐的ID `[(得分, ID, en文本)]`"""
+
+    def __init__(self, src_id: str|tuple, base_id: str, name: str|None, candidates: list[tuple[float, str, str|None]]) -> None:
+        self.src_id = src_id
+        self.base_id = base_id
+        self.name = name
+        self.candidates = candidates
+
+def unresolved_items(ruleset: BaseRuleset, resolved: dict) -> list[tuple[str|tuple, str, str|None]]:
+    """规则集中所有候选ID都不存在的物品 `[(源ID, 基础ID, 显示名称)]`"""
+    items = getattr(ruleset, 'items', dict())
+    unresolved = list()
+    for src_id, (idx, _) in resolved.items():
+        if idx is not None: continue
+        item = items.get(src_id)
+        if item is None:
+            candidates = (src_id,) if isinstance(src_id, str) else src_id
+            item = (next((c for c in candidates if c is not None), ''), None)
+        unresolved.append((src_id, *item))
+    return unresolved
+
+def suggest_ids(manager, rulesets: list[BaseRuleset], top_n: int = config.SUGGEST_TOP_N) -> dict[str, list[Suggestion]]:
+    """
+    为各规则集中找不到ID的物品推荐ID，返回`{规则集名: [Suggestion]}`
+
+    索引只建立一次；已被这些规则集解析到的ID不会被推荐
+    """
+    resolved = dict()
+    taken = set()
+    for ruleset in rulesets:
+        ruleset.bind(manager.store)
+        resolved[ruleset] = manager.resolver.resolve_all(ruleset.get_ids())
+        taken.update(idx for idx, _ in resolved[ruleset].values() if idx is not None)
+    index = IdIndex(manager.store)
+    start = time.perf_counter()
+    en_column = manager.store.columns['en']
+    suggestions = dict()
+    count = 0
+    for ruleset in rulesets:
+        result = suggestions[type(ruleset).__name__] = list()
+        for src_id, base_id, name in unresolved_items(ruleset, resolved[ruleset]):
+            candidates = [
+                (score, manager.store.ids[idx], en_column[idx])
+                for score, idx in index.query(base_id, name, top_n, taken)
+            ]
+            result.append(Suggestion(src_id, base_id, name, candidates))
+            count += 1
+    logging.info(f"Queried {count} unresolved items in {time.perf_counter() - start:.2f}s")
+    return suggestions
+
+def suggestion_path(ruleset: BaseRuleset, output_dir: str) -> str:
+    # cstone规则集使用与direct_id文件相同的文件名
+    sources = ruleset.get_sources()
+    filename = os.path.basename(sources[0]) if len(sources) else f"{type(ruleset).__name__}.txt"
+    return os.path.join(output_dir, filename)
+
+def write_suggestions(
+    suggestions: dict[str, list[Suggestion]],
+    rulesets: list[BaseRuleset],
+    output_dir: str = config.SUGGEST_OUTPUT_DIR
+) -> list[str]:
+    """
+    按direct_id文件的格式写入推荐结果，每个物品先是注释的候选列表，
+    然后是得分最高的映射，其余候选以`#`注释；没有候选的物品整行注释，可以考虑加入ignore文件
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = list()
+    for ruleset in rulesets:
+        items = suggestions.get(type(ruleset).__name__)
+        if not items: continue
+        path = suggestion_path(ruleset, output_dir)
+        with open(path, 'w', encoding=config.ENCODE) as file:
+            for item in items:
+                file.write(f"# {item.base_id}\n" if item.name is None else f"# {item.base_id} ({item.name})\n")
+                if len(item.candidates) == 0:
+                    file.write(f"#{item.base_id}=\n")
+                    continue
+                for score, tid, en_text in item.candidates:
+                    file.write(f"#   {score:.3f} {tid} {en_text or ''}\n")
+                for pos, (score, tid, en_text) in enumerate(item.candidates):
+                    file.write(f"{'#' if pos else ''}{item.base_id}={tid}\n")
+        logging.info(f"Written {len(items)} suggestions to {path}")
+        paths.append(path)
+    return paths
+
+def main(argv: list[str]|None = None):
+    available = ruleset_registry.available_rulesets()
+    default_rulesets = [name for name in ruleset_registry.DEFAULT_RULESETS if ruleset_registry.requires_network(available.get(name, ''))]
+    parser = argparse.ArgumentParser(prog='run.py suggest-ids', description='为cstone中找不到ID的物品推荐direct_id映射')
+    parser.add_argument('--text-dir', default=config.TEXT_FILE_DIR, help='包含en/cn/ref.ini的目录')
+    parser.add_argument('--rulesets', nargs='+', default=default_rulesets, metavar='NAME', help='检查的规则集')
+    parser.add_argument('--top', type=int, default=config.SUGGEST_TOP_N, help='每个物品输出的候选数')
+    parser.add_argument('--output-dir', default=config.SUGGEST_OUTPUT_DIR, help='推荐结果的目录')
+    args = parser.parse_args(argv)
+    try:
+        ruleset_classes = ruleset_registry.load_rulesets(args.rulesets)
+    except KeyError as e:
+        parser.error(e.args[0])
+
+    from generation_manager import GenerationManager
+    manager = GenerationManager(
+        os.path.join(args.text_dir, 'en.ini'),
+        os.path.join(args.text_dir, 'cn.ini'),
+        os.path.join(args.text_dir, 'ref.ini'),
+    )
+    rulesets = manager.create_rulesets(ruleset_classes, manager.prefetch(ruleset_classes))
+    suggestions = suggest_ids(manager, rulesets, args.top)
+    write_suggestions(suggestions, rulesets, args.output_dir)
+    manager.resolver.save()
@@ -0,0 +1,331 @@
+import os, re, json, time, sqlite3, hashlib
+import argparse
+import logging
+import threading
+
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    api TEXT NOT NULL,
+    version TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    item_order TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (api, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS items (
+    api TEXT NOT NULL,
+    version TEXT NOT NULL,
+    item_code TEXT NOT NULL,
+    name TEXT,
+    hash TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (api, version, item_code)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS item_fields (
+    api TEXT NOT NULL,
+    version TEXT NOT NULL,
+    item_code TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value,
+    PRIMARY KEY (api, version, item_code, field)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS item_fields_by_field ON item_fields (field, version);
+CREATE INDEX IF NOT EXISTS items_by_code ON items (item_code, version);
+"""
+
+_NUMBER = re.compile(r'-?\d+(\.\d+)?')
+
+def field_value(value):
+    """字段值的规范化：数字字符串转为数字，列表/字典转为JSON文本"""
+    if isinstance(value, str):
+        if _NUMBER.fullmatch(value):
+            return float(value) if '.' in value else int(value)
+        return value
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+class ItemStore():
+
+    """
+    cstone物品数据的本地SQLite库
+
+    - `payloads`: 每个API在每个版本下最后一次写入的内容哈希、物品顺序和时间
+    - `items`: 每个物品一行(原始JSON和哈希)，按`(api, version, item_code)`唯一
+    - `item_fields`: 物品的各字段，用于跨分类查询和比较不同版本的数据
+
+    写入时整个API的内容未变化则只刷新时间，否则只写入内容有变化的行，删除消失的物品
+    物品顺序单独保存在`payloads`中，增删物品不会导致其余的行被重写
+    规则集通过`rows`读取与API返回值相同的数据，不需要再解析JSON缓存或访问网络
+    `item_fields`中的值经过规范化(参见 field_value)，只用于查询和比较，规则集不从中读取
+    """
+
+    def __init__(self, path: str|None = None, key_field: str|None = None) -> None:
+        # 默认值在调用时读取，基准测试等可以在导入后修改config
+        self.path = path or config.ITEM_STORE_PATH
+        self.key_field = key_field or config.ITEM_KEY_FIELD
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def fetched_at(self, api: str, version: str) -> float|None:
+        with self.lock:
+            row = self.conn.execute('SELECT fetched_at FROM payloads WHERE api = ? AND version = ?', (api, version)).fetchone()
+        return None if row is None else row[0]
+
+    def rows(self, api: str, version: str) -> list[dict]|None:
+        """按原顺序返回API的数据，没有写入过时返回None"""
+        with self.lock:
+            row = self.conn.execute('SELECT item_order FROM payloads WHERE api = ? AND version = ?', (api, version)).fetchone()
+            if row is None: return None
+            payloads = dict(self.conn.execute('SELECT item_code, payload FROM items WHERE api = ? AND version = ?', (api, version)))
+        return [json.loads(payloads[code]) for code in json.loads(row[0])]
+
+    def __keyed(self, rows: list[dict]) -> list[tuple[str, dict, str, str]]:
+        """`[(物品键, 行, JSON, 哈希)]`，没有键字段或键重复时追加位置"""
+        keyed = list()
+        seen = set()
+        for position, row in enumerate(rows):
+            code = str(row.get(self.key_field, '')) if isinstance(row, dict) else ''
+            if code == '' or code in seen:
+                code = f"{code}#{position}"
+            seen.add(code)
+            payload = json.dumps(row, ensure_ascii=False, sort_keys=True)
+            keyed.append((code, row, payload, hashlib.sha1(payload.encode('utf-8')).hexdigest()))
+        return keyed
+
+    def ingest(self, api: str, rows: list[dict], version: str) -> dict[str, int]:
+        """写入一个API的数据，返回各类行数"""
+        start = time.perf_counter()
+        now = time.time()
+        content = json.dumps(rows, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        payload_hash = hashlib.sha1(content).hexdigest()
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        with self.lock, self.conn:
+            current = self.conn.execute('SELECT hash FROM payloads WHERE api = ? AND version = ?', (api, version)).fetchone()
+            if current is not None and current[0] == payload_hash:
+                self.conn.execute('UPDATE payloads SET fetched_at = ? WHERE api = ? AND version = ?', (now, api, version))
+                counts['unchanged'] = len(rows)
+                return counts
+            existing = dict(self.conn.execute('SELECT item_code, hash FROM items WHERE api = ? AND version = ?', (api, version)))
+            upserts = list()
+            fields = list()
+            changed_codes = list()
+            keyed = self.__keyed(rows)
+            for code, row, payload, row_hash in keyed:
+                old = existing.get(code)
+                if old == row_hash:
+                    counts['unchanged'] += 1
+                    continue
+                name = row.get(config.ITEM_NAME_FIELD) if isinstance(row, dict) else None
+                upserts.append((api, version, code, None if name is None else str(name), row_hash, payload, now))
+                counts['updated' if old is not None else 'inserted'] += 1
+                if old is not None:
+                    changed_codes.append((api, version, code))
+                if isinstance(row, dict):
+                    fields.extend((api, version, code, field, field_value(value)) for field, value in row.items())
+            removed = existing.keys() - {code for code, *_ in keyed}
+            counts['deleted'] = len(removed)
+            stale = changed_codes + [(api, version, code) for code in removed]
+            self.conn.executemany('DELETE FROM item_fields WHERE api = ? AND version = ? AND item_code = ?', stale)
+            self.conn.executemany('DELETE FROM items WHERE api = ? AND version = ? AND item_code = ?', [(api, version, code) for code in removed])
+            self.conn.executemany(
+                'INSERT INTO items (api, version, item_code, name, hash, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (api, version, item_code) DO UPDATE SET name = excluded.name, '
+                'hash = excluded.hash, payload = excluded.payload, updated_at = excluded.updated_at',
+                upserts
+            )
+            self.conn.executemany('INSERT INTO item_fields (api, version, item_code, field, value) VALUES (?, ?, ?, ?, ?)', fields)
+            self.conn.execute(
+                'INSERT INTO payloads (api, version, hash, row_count, item_order, fetched_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (api, version) DO UPDATE SET hash = excluded.hash, row_count = excluded.row_count, '
+                'item_order = excluded.item_order, fetched_at = excluded.fetched_at',
+                (api, version, payload_hash, len(rows), json.dumps([code for code, *_ in keyed]), now)
+            )
+        logging.info(
+            f"Item store {api}@{version}: +{counts['inserted']} ~{counts['updated']} -{counts['deleted']} "
+            f"({counts['unchanged']} unchanged) in {time.perf_counter() - start:.3f}s"
+        )
+        return counts
+
+    def versions(self) -> list[tuple[str, int, int, float]]:
+        """`[(版本, API数, 物品数, 最后写入时间)]`"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT version, COUNT(*), SUM(row_count), MAX(fetched_at) FROM payloads GROUP BY version ORDER BY MAX(fetched_at)'
+            ).fetchall()
+
+    def field(self, field: str, version: str, api: str|None = None) -> list[tuple[str, str, str|None, object]]:
+        """所有分类中某个字段的值 `[(api, 物品键, 名称, 值)]`"""
+        sql = (
+            'SELECT f.api, f.item_code, i.name, f.value FROM item_fields f '
+            'JOIN items i ON i.api = f.api AND i.version = f.version AND i.item_code = f.item_code '
+            'WHERE f.field = ? AND f.version = ?'
+        )
+        params = [field, version]
+        if api is not None:
+            sql += ' AND f.api = ?'
+            params.append(api)
+        with self.lock:
+            return self.conn.execute(sql + ' ORDER BY f.api, f.item_code', params).fetchall()
+
+    def diff(self, old_version: str, new_version: str, api: str|None = None, fields: list[str]|None = None) -> dict[str, list]:
+        """
+        比较两个版本的物品数据，返回
+        `{'added': [(api, 物品键, 名称)], 'removed': [...], 'changed': [(api, 物品键, 名称, 字段, 旧值, 新值)]}`
+        字段只在一个版本中存在时，另一侧的值为None
+        """
+        api_filter = '' if api is None else ' AND a.api = ?'
+        api_params = [] if api is None else [api]
+        field_filter = '' if not fields else f" AND f.field IN ({', '.join('?' * len(fields))})"
+        field_params = list(fields or [])
+        missing = (
+            'SELECT a.api, a.item_code, a.name FROM items a WHERE a.version = ?' + api_filter +
+            ' AND NOT EXISTS (SELECT 1 FROM items b WHERE b.api = a.api AND b.item_code = a.item_code AND b.version = ?)'
+            ' ORDER BY a.api, a.item_code'
+        )
+        changed = (
+            'SELECT a.api, a.item_code, a.name, f.field, '
+            '(SELECT value FROM item_fields WHERE api = a.api AND version = ? AND item_code = a.item_code AND field = f.field), '
+            '(SELECT value FROM item_fields WHERE api = a.api AND version = ? AND item_code = a.item_code AND field = f.field) '
+            'FROM items a JOIN items b ON b.api = a.api AND b.item_code = a.item_code AND b.version = ? '
+            'JOIN (SELECT api, item_code, field FROM item_fields WHERE version IN (?, ?)) f ON f.api = a.api AND f.item_code = a.item_code '
+            'WHERE a.version = ? AND a.hash != b.hash' + api_filter + field_filter +
+            ' GROUP BY a.api, a.item_code, f.field ORDER BY a.api, a.item_code, f.field'
+        )
+        with self.lock:
+            added = self.conn.execute(missing, [new_version, *api_params, old_version]).fetchall()
+            removed = self.conn.execute(missing, [old_version, *api_params, new_version]).fetchall()
+            rows = self.conn.execute(
+                changed,
+                [old_version, new_version, old_version, old_version, new_version, new_version, *api_params, *field_params]
+            ).fetchall()
+        return {
+            'added': added,
+            'removed': removed,
+            'changed': [row for row in rows if row[4] != row[5]],
+        }
+
+def item_version(text_dir: str|None = None) -> str:
+    """写入和读取物品库时使用的版本，默认为文本目录名(如`text_files/4.4.0` -> `4.4.0`)"""
+    if config.ITEM_STORE_VERSION:
+        return config.ITEM_STORE_VERSION
+    text_dir = text_dir or config.TEXT_FILE_DIR
+    return os.path.basename(os.path.normpath(text_dir.replace('\\', '/')))
+
+_default_store: ItemStore|None = None
+_default_lock = threading.Lock()
+
+def get_default_store() -> ItemStore:
+    global _default_store
+    with _default_lock:
+        if _default_store is None or _default_store.path != config.ITEM_STORE_PATH:
+            _default_store = ItemStore()
+    return _default_store
+
+def load_apis(
+    apis: list[str],
+    base_url: str = config.CSTONE_BASE_URL,
+    version: str|None = None,
+    store: ItemStore|None = None
+) -> dict:
+    """
+    获取多个API的数据，返回`{api: json_data}`，获取失败的API不会出现在结果中
+    `version`为None时使用`config.TEXT_FILE_DIR`对应的版本(参见 item_version)
+
+    物品库中该版本的数据未过期(`CSTONE_CACHE_TTL`)或处于离线模式时直接从库中读取，不导入requests；
+    其余的API通过`cstone_api.fetch_apis`获取(仍然使用磁盘缓存和条件请求)，再把有变化的行写入物品库
+    """
+    apis = list(dict.fromkeys(apis))
+    if not config.ITEM_STORE_ENABLED:
+        from cstone_api import fetch_apis
+        return fetch_apis(apis, base_url)
+    store = store if store is not None else get_default_store()
+    version = version or item_version()
+    start = time.perf_counter()
+    result = dict()
+    stale = list()
+    for api in apis:
+        fetched_at = store.fetched_at(api, version)
+        if fetched_at is not None and (config.CSTONE_OFFLINE or time.time() - fetched_at < config.CSTONE_CACHE_TTL):
+            result[api] = store.rows(api, version)
+        else:
+            stale.append(api)
+    if len(result):
+        logging.info(f"Loaded {len(result)} apis from item store ({version}) in {time.perf_counter() - start:.3f}s")
+    if len(stale):
+        from cstone_api import fetch_apis
+        fetched = fetch_apis(stale, base_url)
+        ingest_apis(fetched, version, store)
+        result.update(fetched)
+    return result
+
+def ingest_apis(api_data: dict, version: str, store: ItemStore|None = None) -> None:
+    """把已获取的API数据写入物品库的某个版本，同时构建多个版本时共用一次抓取(参见 batch_build.py)"""
+    if not config.ITEM_STORE_ENABLED or len(api_data) == 0: return
+    store = store if store is not None else get_default_store()
+    for api, rows in api_data.items():
+        try:
+            store.ingest(api, rows, version)
+        except Exception as e:
+            logging.warning(f"[ITEM_STORE_EXECPTION] {api}@{version} 写入失败: {e}")
+
+def load_api(
+    api: str,
+    base_url: str = config.CSTONE_BASE_URL,
+    version: str|None = None,
+    store: ItemStore|None = None
+):
+    """获取一个API的数据(参见 load_apis)，失败时抛出异常"""
+    if not config.ITEM_STORE_ENABLED:
+        from cstone_api import fetch_api
+        return fetch_api(api, base_url)
+    result = load_apis([api], base_url, version, store)
+    if api not in result:
+        raise RuntimeError(f"[CSTONE_EXECPTION] {api} 获取失败")
+    return result[api]
+
+def main(argv: list[str]|None = None):
+    parser = argparse.ArgumentParser(prog='run.py items', description='查询本地cstone物品库')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('versions', help='列出物品库中的版本')
+    field_parser = commands.add_parser('field', help='列出所有分类中某个字段的值')
+    field_parser.add_argument('field')
+    field_parser.add_argument('--version', default=item_version(), help='默认为config.TEXT_FILE_DIR对应的版本')
+    field_parser.add_argument('--api')
+    diff_parser = commands.add_parser('diff', help='比较两个版本的物品数据')
+    diff_parser.add_argument('old_version')
+    diff_parser.add_argument('new_version')
+    diff_parser.add_argument('--api')
+    diff_parser.add_argument('--fields', nargs='+', help='只比较这些字段，如Misdmg Hunger')
+    diff_parser.add_argument('--json', help='把完整结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    store = ItemStore()
+    if args.command == 'versions':
+        for version, apis, items, fetched_at in store.versions():
+            print(f"{version:<16}{apis:>4} apis{items:>8} items  {time.strftime('%Y-%m-%d %H:%M', time.localtime(fetched_at))}")
+    elif args.command == 'field':
+        for api, code, name, value in store.field(args.field, args.version, args.api):
+            print(f"{api}\t{code}\t{name or ''}\t{value}")
+    else:
+        result = store.diff(args.old_version, args.new_version, args.api, args.fields)
+        for api, code, name in result['added']:
+            print(f"+ {api} {code} {name or ''}")
+        for api, code, name in result['removed']:
+            print(f"- {api} {code} {name or ''}")
+        for api, code, name, field, old, new in result['changed']:
+            print(f"~ {api} {code} {name or ''}: {field} {old} -> {new}")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+    store.close()
@@ -1,6 +1,8 @@
 from base_ruleset import BaseRuleset
+from pattern_ruleset import PatternRule, PatternRuleset
+from text_substitution import SubstitutionRuleset
 import config
-from utils import read_file_lines
+from utils import iter_file_lines
 
 class BombRuleset(BaseRuleset):
     
@@ -28,6 +30,9 @@ class BombRuleset(BaseRuleset):
             'item_NameBOMB_S10_FSKI_Colossus': (10, 568297)
         }
         
+    def fingerprint(self, tid: str | tuple) -> str | None:
+        return repr(self.stat.get(str(tid)))
+        
     def translate(self, tid: str | tuple, cn_str: str | None, en_str: str | None) -> str:
         size, dmg = self.stat[str(tid)]
         return f"{en_str} [{cn_str}]\\nS{size} 伤害{dmg}"
@@ -41,6 +46,7 @@ class GeneralReplaceRuleset(BaseRuleset):
     
     def __init__(self, ruleset_folder = 'custom/data/direct_replace'):
         super().__init__()
+        self.ruleset_folder = ruleset_folder
         self.data = dict()
         import os, logging
         for filename in os.listdir(ruleset_folder):
@@ -49,7 +55,7 @@ class GeneralReplaceRuleset(BaseRuleset):
             logging.info(f"读取{full_path}")
             with open(full_path, 'r', encoding=config.ENCODE, errors='replace') as file:
                 logging.info(f"Reading {full_path}")
-                for line in read_file_lines(file):
+                for line in iter_file_lines(file):
                     tid, p, text = line.partition('=')
                     if (tid.startswith('#') or tid == '') and p != '=' and text == '':
                         continue
@@ -58,6 +64,14 @@ class GeneralReplaceRuleset(BaseRuleset):
                     
         logging.info('直接替换规则集初始化完毕')
     
+    def get_sources(self) -> list[str]:
+        return [self.ruleset_folder]
+    
+    def fingerprint(self, tid: str | tuple) -> str | None:
+        if isinstance(tid, tuple):
+            tid = str(tid[0]).upper()
+        return repr(self.data.get(tid))
+    
     def translate(self, tid: str | tuple, cn_str: str | None, en_str: str | None) -> str:
         if isinstance(tid, tuple):
             tid = str(tid[0]).upper()
@@ -65,6 +79,27 @@ class GeneralReplaceRuleset(BaseRuleset):
             raise KeyError('文本ID不存在')
         return self.data[tid]
 
+class LocationPatternRuleset(PatternRuleset):
+    
+    """
+    地点名称的模式规则集(参见process.md)
+    """
+    
+    RULES = [
+        # 拉格朗日点，简化双语名称
+        PatternRule(r'RR_([A-Z]{3})_(L\d)', '{0}-{1} [{cn}]', exclude=r'_[dD]esc'),
+        PatternRule(r'FOB_.*_FOB', '{en} - [{cn}]', exclude=r'_[dD]esc'),
+    ]
+
+class TextSubstitutionRuleset(SubstitutionRuleset):
+    
+    """
+    全局文本替换(参见process.md)，如`μSCU`改为`uSCU`
+    """
+    
+    def __init__(self, ruleset_folder = 'custom/data/substitution', normalize_whitespace = config.SUBSTITUTION_NORMALIZE_WHITESPACE):
+        super().__init__(ruleset_folder, normalize_whitespace)
+
 # TODO
 # class RepRuleset(BaseRuleset):
     
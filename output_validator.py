@@ -0,0 +1,200 @@
+import os, re
+import logging
+from collections import Counter
+from itertools import repeat
+
+import config
+from text_store import TextStore
+from output_writer import OutputVariant
+from utils import iter_file_lines
+
+# ~mission(Contractor|...)形式的游戏变量，以及printf风格的格式符
+# 标志中不含空格，否则`提高10% during`这样的普通文本会被识别为`% d`
+PLACEHOLDER_RE = re.compile(r'~\w+\([^()]*\)|%(?:\d+\$)?[-+#0]*\d*(?:\.\d+)?l?[sdifuxXc]')
+# 反斜杠和其后的一个字符，行尾单独的反斜杠匹配为空
+ESCAPE_RE = re.compile(r'\\(.?)')
+VALID_ESCAPES = frozenset('nt\\')
+# 合法的ID，不能包含空白和`=`
+KEY_RE = re.compile(r'[^\s=]+')
+
+class ValidationIssue():
+
+    """
+    输出校验发现的问题
+
+    `source`为'result'(规则集结果)、'<后缀文件>:<行号>'或'suffix_data'
+    """
+
+    def __init__(self, tid: str, kind: str, message: str, source: str) -> None:
+        self.tid = tid
+        self.kind = kind
+        self.message = message
+        self.source = source
+
+    def __repr__(self) -> str:
+        return f"{self.source} {self.tid}: {self.message}"
+
+def check_placeholders(text: str, en_str: str) -> str|None:
+    """
+    比较占位符的多重集合
+
+    双语文本会包含多份原文，因此允许每个占位符的次数都是原文的同一整数倍
+    """
+    if '~' not in text and '%' not in text and '~' not in en_str and '%' not in en_str: return None
+    expected = Counter(PLACEHOLDER_RE.findall(en_str))
+    actual = Counter(PLACEHOLDER_RE.findall(text))
+    if actual == expected: return None
+    if actual.keys() == expected.keys():
+        token = next(iter(expected))
+        times = actual[token] // expected[token]
+        if times > 0 and all(actual[t] == expected[t] * times for t in expected): return None
+    missing = expected - actual
+    extra = actual - expected
+    return f"占位符不一致, 缺少{sorted(missing.elements())}, 多出{sorted(extra.elements())}"
+
+def check_escapes(text: str, en_str: str|None) -> str|None:
+    if '\\' not in text: return None
+    allowed = VALID_ESCAPES
+    if en_str is not None and '\\' in en_str:
+        allowed = allowed | {char for char in ESCAPE_RE.findall(en_str) if char}
+    for char in ESCAPE_RE.findall(text):
+        if char == '': return "行尾有单独的反斜杠"
+        if char not in allowed: return f"无效的转义序列 \\{char}"
+    return None
+
+def find_budget(tid: str, budgets: list[tuple[str, int]]) -> int|None:
+    key = tid.upper()
+    for prefix, limit in budgets:
+        if key.startswith(prefix): return limit
+    return None
+
+def validate_items(
+    items: list[tuple[str, str, str, str|None]],
+    budgets: list[tuple[str, int]]
+) -> list[tuple[str, str, str, str]]:
+    """
+    校验一批`(ID, 来源, 文本, 英文原文)`，返回问题`(ID, 类型, 说明, 来源)`，可以在子进程中运行
+    `budgets`为按前缀长度降序排列的`(大写前缀, 最大长度)`
+    """
+    issues = list()
+    for tid, source, text, en_str in items:
+        if '\n' in text or '\r' in text:
+            issues.append((tid, 'newline', "文本中包含换行符，会破坏ini的行结构", source))
+        message = check_escapes(text, en_str)
+        if message is not None:
+            issues.append((tid, 'escape', message, source))
+        if en_str is not None:
+            message = check_placeholders(text, en_str)
+            if message is not None:
+                issues.append((tid, 'placeholder', message, source))
+        if len(budgets):
+            limit = find_budget(tid, budgets)
+            if limit is not None and len(text) > limit:
+                issues.append((tid, 'length', f"长度{len(text)}超过上限{limit}", source))
+    return issues
+
+class OutputValidator():
+
+    """
+    生成前的输出校验
+
+    一次遍历所有规则集结果和后缀数据，与对应的英文原文比较占位符和转义序列，
+    检查后缀数据中格式错误、重复或覆盖规则集结果的ID，以及按ID前缀的长度上限
+    文本数较多时分块在多个进程中校验
+    """
+
+    def __init__(
+        self,
+        store: TextStore,
+        budgets: dict[str, int] = config.OUTPUT_LENGTH_BUDGETS,
+        chunk_size: int = config.VALIDATE_CHUNK_SIZE,
+        process_threshold: int = config.VALIDATE_PROCESS_THRESHOLD,
+        max_workers: int = config.RULESET_WORKERS
+    ) -> None:
+        self.store = store
+        self.budgets = sorted(((prefix.upper(), limit) for prefix, limit in budgets.items()), key=lambda item: -len(item[0]))
+        self.chunk_size = chunk_size
+        self.process_threshold = process_threshold
+        self.max_workers = max_workers
+
+    def __read_suffix_file(self, path: str, issues: list[tuple]) -> list[tuple[str, str, str]]:
+        """读取后缀文件，返回`(ID, 来源, 文本)`，格式错误的行记录为问题"""
+        entries = list()
+        name = os.path.basename(path)
+        try:
+            with open(path, 'r', encoding=config.ENCODE, errors='replace') as file:
+                for lineno, line in enumerate(iter_file_lines(file), 1):
+                    if line.strip() == '' or line.startswith('#'): continue
+                    tid, p, text = line.partition('=')
+                    source = f"{name}:{lineno}"
+                    if p != '=' or KEY_RE.fullmatch(tid) is None:
+                        issues.append((tid, 'malformed', f"格式错误的行: {line[:80]}", source))
+                        continue
+                    entries.append((tid, source, text))
+        except OSError as e:
+            logging.warning(f"[VALIDATE_EXECPTION] {e}")
+        return entries
+
+    def collect(
+        self,
+        results: dict[int, str],
+        variants: list[OutputVariant],
+        owners: dict[int, str]
+    ) -> tuple[list[tuple[str, str, str, str|None]], list[tuple]]:
+        """收集需要逐条校验的文本，同时检查后缀数据的重复ID"""
+        ids = self.store.ids
+        en_column = self.store.columns['en']
+        items = [(ids[idx], 'result', text, en_column[idx]) for idx, text in results.items() if text is not None]
+        issues = list()
+        suffix_files = dict()
+        suffix_data = dict()
+        reported = set()
+        for variant in variants:
+            entries = list()
+            for path in variant.suffix_files:
+                if path not in suffix_files:
+                    suffix_files[path] = self.__read_suffix_file(path, issues)
+                entries.extend(suffix_files[path])
+            for tid, text in variant.suffix_data.items():
+                entries.append((tid, 'suffix_data', str(text)))
+                suffix_data[tid] = str(text)
+            seen = dict()
+            for tid, source, _ in entries:
+                key = tid.upper()
+                if key in seen:
+                    if (key, source) not in reported:
+                        reported.add((key, source))
+                        issues.append((tid, 'duplicate', f"与{seen[key]}中的ID重复", source))
+                    continue
+                seen[key] = source
+                idx = self.store.index.get(key)
+                if idx is None or results.get(idx) is None or not variant.includes(owners.get(idx)): continue
+                if (key, source) not in reported:
+                    reported.add((key, source))
+                    issues.append((tid, 'duplicate', f"覆盖了{owners.get(idx)}生成的结果", source))
+        for entries in suffix_files.values():
+            for tid, source, text in entries:
+                idx = self.store.index.get(tid.upper())
+                items.append((tid, source, text, None if idx is None else en_column[idx]))
+        for tid, text in suffix_data.items():
+            idx = self.store.index.get(tid.upper())
+            items.append((tid, 'suffix_data', text, None if idx is None else en_column[idx]))
+        return items, issues
+
+    def validate(
+        self,
+        results: dict[int, str],
+        variants: list[OutputVariant],
+        owners: dict[int, str]
+    ) -> list[ValidationIssue]:
+        items, issues = self.collect(results, variants, owners)
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        if len(items) >= self.process_threshold and len(chunks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as pool:
+                for chunk_issues in pool.map(validate_items, chunks, repeat(self.budgets)):
+                    issues.extend(chunk_issues)
+        else:
+            for chunk in chunks:
+                issues.extend(validate_items(chunk, self.budgets))
+        return [ValidationIssue(*issue) for issue in issues]
@@ -0,0 +1,13 @@
+from output_validator import PLACEHOLDER_RE, check_placeholders
+
+# 普通文本中的百分号不应被识别为格式符
+
+def test_percent_in_prose_is_not_a_placeholder():
+    assert PLACEHOLDER_RE.findall('Increases speed by 10% during boost') == []
+    assert check_placeholders('提高10%，持续时间', 'Increases speed by 10% during boost') is None
+
+def test_printf_placeholders():
+    assert PLACEHOLDER_RE.findall('%s has %d items, %1$s %-5.2f') == ['%s', '%d', '%1$s', '%-5.2f']
+    assert PLACEHOLDER_RE.findall('~mission(Contractor|Name) %s') == ['~mission(Contractor|Name)', '%s']
+    assert check_placeholders('%s 有 %d 个', '%s has %d') is None
+    assert check_placeholders('有 %d 个', '%s has %d') is not None
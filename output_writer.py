@@ -0,0 +1,82 @@
+import os, codecs
+import logging
+from typing import Type
+
+import config
+from base_ruleset import BaseRuleset
+
+# 预先编码的内容使用的编码，BOM只在文件开头写入一次
+BODY_ENCODING = 'utf-8' if codecs.lookup(config.ENCODE).name == 'utf-8-sig' else config.ENCODE
+
+class OutputVariant():
+
+    """
+    一种输出文件
+
+    `rulesets`为参与该输出的规则集(类或类名)，None表示全部规则集，
+    未参与的规则集生成的ID使用ref文本
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        rulesets: list[Type[BaseRuleset]|str]|None = None,
+        suffix_files: str|list|None = None,
+        suffix_data: dict|None = None
+    ) -> None:
+        self.output_path = output_path
+        self.rulesets = None if rulesets is None else {r if isinstance(r, str) else r.__name__ for r in rulesets}
+        if isinstance(suffix_files, str):
+            suffix_files = [suffix_files]
+        self.suffix_files = suffix_files or []
+        self.suffix_data = suffix_data or dict()
+
+    def includes(self, ruleset_name: str|None) -> bool:
+        return self.rulesets is None or ruleset_name in self.rulesets
+
+class BufferedWriter():
+
+    """
+    按块写入的输出文件
+
+    行先积累在列表中，达到`chunk_lines`后拼接成一次写入，
+    内容写入同目录的临时文件，`commit`时再原子地替换目标文件
+    """
+
+    def __init__(self, output_path: str, chunk_lines: int = 16384) -> None:
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.tmp"
+        self.chunk_lines = chunk_lines
+        self.buffer: list[str] = list()
+        self.file = open(self.tmp_path, 'w', encoding=config.ENCODE, errors='replace')
+
+    def write(self, text: str) -> None:
+        self.buffer.append(text)
+        if len(self.buffer) >= self.chunk_lines:
+            self.flush()
+
+    def write_bytes(self, data: bytes) -> None:
+        """写入已经按`BODY_ENCODING`编码的内容"""
+        self.flush()
+        # 空写入会让文本层先输出BOM
+        self.file.write('')
+        self.file.flush()
+        self.file.buffer.write(data)
+
+    def flush(self) -> None:
+        if len(self.buffer):
+            self.file.write(''.join(self.buffer))
+            self.buffer = list()
+
+    def commit(self) -> None:
+        self.flush()
+        self.file.close()
+        os.replace(self.tmp_path, self.output_path)
+        logging.info(f"Written {self.output_path}")
+
+    def abort(self) -> None:
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
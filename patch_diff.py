@@ -0,0 +1,135 @@
+import os, json, time
+import argparse
+import logging
+
+import config
+import ruleset_registry
+from base_ruleset import BaseRuleset
+from text_store import TextStore
+
+LANG_FILES = {
+    'en': config.EN_FILE_NAME,
+    'cn': config.CN_FILE_NAME,
+    'ref': 'ref.ini',
+}
+
+# 默认检查的规则集，与构建时一致
+DEFAULT_RULESETS = ruleset_registry.DEFAULT_RULESETS
+
+def load_version(version_dir: str) -> TextStore:
+    return TextStore.from_files({lang: os.path.join(version_dir, filename) for lang, filename in LANG_FILES.items()})
+
+def diff_column(old_store: TextStore, new_store: TextStore, lang: str) -> dict:
+    """
+    比较一种语言的文本，返回新增/删除/修改/重命名的ID
+
+    文本按哈希比较，删除和新增的ID中文本哈希相同(且唯一、非空)的视为重命名
+    """
+    old_hashes = {tid: hash(text) for tid, text in zip(old_store.ids, old_store.columns[lang]) if text is not None}
+    new_hashes = {tid: hash(text) for tid, text in zip(new_store.ids, new_store.columns[lang]) if text is not None}
+    removed = old_hashes.keys() - new_hashes.keys()
+    added = new_hashes.keys() - old_hashes.keys()
+    changed = [tid for tid in old_hashes.keys() & new_hashes.keys() if old_hashes[tid] != new_hashes[tid]]
+
+    empty = hash('')
+    removed_by_hash = dict()
+    for tid in removed:
+        h = old_hashes[tid]
+        if h == empty: continue
+        removed_by_hash[h] = None if h in removed_by_hash else tid
+    added_by_hash = dict()
+    for tid in added:
+        h = new_hashes[tid]
+        if h == empty: continue
+        added_by_hash[h] = None if h in added_by_hash else tid
+    renamed = dict()
+    for h, old_tid in removed_by_hash.items():
+        new_tid = added_by_hash.get(h)
+        if old_tid is None or new_tid is None: continue
+        renamed[old_tid] = new_tid
+    removed -= renamed.keys()
+    added -= set(renamed.values())
+    return {
+        'added': sorted(added),
+        'removed': sorted(removed),
+        'changed': sorted(changed),
+        'renamed': dict(sorted(renamed.items())),
+    }
+
+def diff_versions(old_store: TextStore, new_store: TextStore) -> dict[str, dict]:
+    return {lang: diff_column(old_store, new_store, lang) for lang in old_store.langs if lang in new_store.langs}
+
+def affected_rulesets(rulesets: list[BaseRuleset], diff: dict[str, dict], new_store: TextStore) -> dict[str, dict]:
+    """
+    找出涉及变化的ID的规则集
+
+    候选ID元组中任意一个ID被修改/删除/重命名即视为涉及
+    返回`{规则集名: {'changed': [...], 'vanished': [...]}}`
+    """
+    changed = set()
+    vanished = set()
+    for result in diff.values():
+        changed.update(tid.upper() for tid in result['changed'])
+        vanished.update(tid.upper() for tid in result['removed'])
+        vanished.update(tid.upper() for tid in result['renamed'])
+    touched_ids = changed | vanished
+    affected = dict()
+    for ruleset in rulesets:
+        ruleset.bind(new_store)
+        touched = {'changed': [], 'vanished': []}
+        for src_id in ruleset.get_ids():
+            candidates = (src_id,) if isinstance(src_id, str) else src_id
+            keys = {candidate.upper() for candidate in candidates if candidate is not None}
+            if keys & vanished and not any(key in new_store.index for key in keys):
+                touched['vanished'].append(str(src_id))
+            elif keys & touched_ids:
+                touched['changed'].append(str(src_id))
+        if len(touched['changed']) or len(touched['vanished']):
+            affected[type(ruleset).__name__] = touched
+    return affected
+
+def create_rulesets(names: list[str]) -> list[BaseRuleset]:
+    """按名称创建规则集，只导入用到的规则集模块(参见 ruleset_registry)"""
+    return [ruleset_cls() for ruleset_cls in ruleset_registry.load_rulesets(names)]
+
+def print_report(diff: dict[str, dict], affected: dict[str, dict]|None, limit: int = 20) -> None:
+    for lang, result in diff.items():
+        print(f"[{lang}] added {len(result['added'])}, removed {len(result['removed'])}, "
+              f"changed {len(result['changed'])}, renamed {len(result['renamed'])}")
+        for kind in ('added', 'removed', 'changed'):
+            for tid in result[kind][:limit]:
+                print(f"  {kind[0].upper()} {tid}")
+        for old_tid, new_tid in list(result['renamed'].items())[:limit]:
+            print(f"  R {old_tid} -> {new_tid}")
+    if affected is not None:
+        for name, touched in affected.items():
+            print(f"[{name}] changed {len(touched['changed'])}, vanished {len(touched['vanished'])}")
+            for src_id in touched['vanished'][:limit]:
+                print(f"  ! {src_id}")
+            for src_id in touched['changed'][:limit]:
+                print(f"  ~ {src_id}")
+
+def main(argv: list[str]|None = None):
+    parser = argparse.ArgumentParser(prog='run.py diff', description='比较两个版本的文本文件(en/cn/ref.ini)')
+    parser.add_argument('old_dir')
+    parser.add_argument('new_dir')
+    parser.add_argument('--rulesets', nargs='*', default=None, help=f"检查涉及变化ID的规则集，不带参数时为{', '.join(DEFAULT_RULESETS)}")
+    parser.add_argument('--json', help='把完整结果写入JSON文件')
+    parser.add_argument('--limit', type=int, default=20, help='每类最多显示的条数')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    old_store = load_version(args.old_dir)
+    new_store = load_version(args.new_dir)
+    diff = diff_versions(old_store, new_store)
+    logging.info(f"Diff finished in {time.perf_counter() - start:.3f}s")
+    affected = None
+    if args.rulesets is not None:
+        affected = affected_rulesets(create_rulesets(args.rulesets or DEFAULT_RULESETS), diff, new_store)
+    print_report(diff, affected, args.limit)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'diff': diff, 'affected': affected}, file, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
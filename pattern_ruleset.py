@@ -0,0 +1,195 @@
+import re
+import logging
+from typing import Iterable
+
+from base_ruleset import BaseRuleset
+from text_store import TextStore
+
+# 正则中会终止字面前缀的字符
+_META_CHARS = set('.^$*+?{}[]\\|()')
+# 字面前缀之后如果是这些字符，前缀的最后一个字符是可选/可重复的
+_QUANTIFIERS = set('*+?{')
+# 全局标志，如`(?i)`、`(?ms)`
+_GLOBAL_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+# 分桶使用的最大前缀长度
+_MAX_BUCKET_PREFIX = 4
+
+def has_top_level_alternation(pattern: str) -> bool:
+    """正则是否包含不在分组或字符类中的`|`，例如`RR_X|FOB_Y`"""
+    depth = 0
+    in_class = False
+    escaped = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return True
+    return False
+
+def standalone_pattern(pattern: str, regex: re.Pattern) -> bool:
+    """
+    不能放入交替正则的模式，需要单独匹配：
+    命名分组(多条规则同名时冲突)、反向引用(合并后分组编号改变)和全局标志如`(?i)`(只能出现在开头)
+    """
+    if regex.groupindex: return True
+    escaped = False
+    for i, c in enumerate(pattern):
+        if escaped:
+            if c in '123456789': return True
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif c == '(' and _GLOBAL_FLAGS.match(pattern, i):
+            return True
+    return False
+
+def literal_prefix(pattern: str) -> str:
+    """
+    正则开头的字面前缀，例如`RR_([A-Z]{3})`为`RR_`
+    包含顶层的`|`时各分支的开头不同，没有字面前缀
+    """
+    if has_top_level_alternation(pattern): return ''
+    prefix = []
+    for i, c in enumerate(pattern):
+        if c in _META_CHARS:
+            if c in _QUANTIFIERS and len(prefix): prefix.pop()
+            break
+        prefix.append(c)
+    return ''.join(prefix)
+
+class PatternRule():
+
+    """
+    基于ID模式的规则
+
+    - `pattern`: 从ID开头匹配的正则，含命名分组、反向引用或全局标志的规则单独匹配，速度较慢
+    - `template`: 输出格式，`{0}`/`{1}`...为pattern中的分组，另外可以使用`{id}`/`{en}`/`{cn}`
+    - `exclude`: 在ID中搜索到则不应用该规则的正则，例如`_[dD]esc`
+    """
+
+    def __init__(self, pattern: str, template: str, exclude: str|None = None, ignore_case: bool = False) -> None:
+        self.pattern = pattern
+        self.template = template
+        self.exclude = exclude
+        self.ignore_case = ignore_case
+        self.regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        self.exclude_regex = re.compile(exclude) if exclude else None
+
+    def __repr__(self) -> str:
+        return f"PatternRule({self.pattern!r}, {self.template!r}, {self.exclude!r}, {self.ignore_case!r})"
+
+    def match(self, tid: str) -> tuple|None:
+        m = self.regex.match(tid)
+        if m is None: return None
+        if self.exclude_regex is not None and self.exclude_regex.search(tid): return None
+        return m.groups()
+
+class PatternMatcher():
+
+    """
+    把多条规则编译成一个匹配器，每个ID只需匹配一次
+
+    规则按字面前缀的前几个字符分桶，每个桶(加上没有字面前缀的规则)编译成一个
+    `(?P<r0>...)|(?P<r1>...)`的交替正则，ID按前缀找到桶后只做一次匹配
+    交替正则按规则顺序排列，因此靠前的规则优先
+    无法合并的规则(参见 standalone_pattern)在交替正则之外按顺序单独匹配
+    """
+
+    def __init__(self, rules: list[PatternRule]) -> None:
+        self.rules = rules
+        self.standalone = [i for i, rule in enumerate(rules) if standalone_pattern(rule.pattern, rule.regex)]
+        standalone = set(self.standalone)
+        prefixes = {i: ('' if rule.ignore_case else literal_prefix(rule.pattern)) for i, rule in enumerate(rules) if i not in standalone}
+        lengths = [len(prefix) for prefix in prefixes.values() if len(prefix)]
+        self.prefix_len = min(min(lengths), _MAX_BUCKET_PREFIX) if len(lengths) else 0
+        wildcard = [i for i, prefix in prefixes.items() if len(prefix) == 0]
+        buckets: dict[str, list[int]] = dict()
+        if self.prefix_len:
+            for i, prefix in prefixes.items():
+                if len(prefix) == 0: continue
+                buckets.setdefault(prefix[:self.prefix_len], []).append(i)
+        self.buckets = {key: self.__compile(sorted(indices + wildcard)) for key, indices in buckets.items()}
+        self.wildcard = self.__compile(wildcard) if len(wildcard) else None
+
+    def __compile(self, indices: list[int]) -> re.Pattern:
+        parts = []
+        for i in indices:
+            rule = self.rules[i]
+            pattern = f"(?i:{rule.pattern})" if rule.ignore_case else rule.pattern
+            parts.append(f"(?P<r{i}>{pattern})")
+        return re.compile('|'.join(parts))
+
+    def match(self, tid: str) -> tuple[int, tuple]|None:
+        """返回(规则下标, 分组)"""
+        regex = self.buckets.get(tid[:self.prefix_len], self.wildcard) if self.prefix_len else self.wildcard
+        first = None
+        if regex is not None:
+            m = regex.match(tid)
+            if m is not None: first = int(m.lastgroup[1:])
+        # 优先级高于交替正则结果的单独匹配的规则
+        for i in self.standalone:
+            if first is not None and i > first: break
+            groups = self.rules[i].match(tid)
+            if groups is not None: return i, groups
+        if first is None: return None
+        groups = self.rules[first].match(tid)
+        if groups is not None: return first, groups
+        # 第一个匹配的规则被排除了，按顺序检查后面的规则
+        for i in range(first + 1, len(self.rules)):
+            groups = self.rules[i].match(tid)
+            if groups is not None: return i, groups
+        return None
+
+class PatternRuleset(BaseRuleset):
+
+    """
+    ### 模式规则集
+    根据ID模式对全部文本分类，每个ID只匹配一次所有规则(参见 PatternMatcher)
+    子类在`RULES`中声明规则，靠前的规则优先
+    """
+
+    RULES: list[PatternRule] = []
+
+    def __init__(self, rules: Iterable[PatternRule]|None = None) -> None:
+        super().__init__()
+        self.rules = list(rules if rules is not None else self.RULES)
+        self.matcher = PatternMatcher(self.rules)
+        self.matches: dict[str, tuple[int, tuple]] = dict()
+        self.bound: TextStore|None = None
+
+    def bind(self, store: TextStore) -> None:
+        # 常驻模式下未变化的规则集会被再次绑定到同一份文本
+        if self.bound is store: return
+        self.bound = store
+        for tid in store.ids:
+            result = self.matcher.match(tid)
+            if result is None: continue
+            self.matches[tid] = result
+            self.id_set.add(tid)
+        logging.info(f"{type(self).__name__} matched {len(self.matches)} ids")
+
+    def __getstate__(self):
+        # 匹配结果已经记录在matches中，传给子进程时不需要整份文本
+        state = self.__dict__.copy()
+        state['bound'] = None
+        return state
+
+    def fingerprint(self, tid: str|tuple) -> str|None:
+        result = self.matches.get(tid)
+        if result is None: return None
+        return repr((self.rules[result[0]], result[1]))
+
+    def translate(self, tid: str|tuple, cn_str: str|None, en_str: str|None) -> str:
+        if cn_str is None or en_str is None: raise RuntimeError("文本未提供")
+        index, groups = self.matches[tid]
+        return self.rules[index].template.format(*groups, id=tid, en=en_str, cn=cn_str)
@@ -0,0 +1,42 @@
+from pattern_ruleset import PatternRule, PatternMatcher, literal_prefix
+
+# 匹配器按前缀分桶后的结果应与逐条规则匹配完全一致
+
+def expected_match(rules, tid):
+    return next(((i, groups) for i, rule in enumerate(rules) if (groups := rule.match(tid)) is not None), None)
+
+def test_top_level_alternation_has_no_prefix():
+    assert literal_prefix(r'RR_X|FOB_Y') == ''
+    assert literal_prefix(r'(?:RR|FOB)_X') == ''
+    assert literal_prefix(r'RR_(A|B)') == 'RR_'
+    assert literal_prefix(r'RR_[|]X') == 'RR_'
+    assert literal_prefix(r'RR_\|X') == 'RR_'
+
+def test_matcher_agrees_with_rules():
+    rules = [
+        PatternRule(r'RR_([A-Z]{3})_(L\d)', '{0}-{1}', exclude=r'_[dD]esc'),
+        PatternRule(r'RR_X|FOB_Y', 'alt'),
+        PatternRule(r'FOB_.*_FOB', 'fob'),
+    ]
+    matcher = PatternMatcher(rules)
+    for tid in ['RR_ABC_L1', 'RR_ABC_L1_desc', 'RR_X', 'FOB_Y', 'FOB_Y_FOB', 'FOB_Z_FOB', 'OTHER']:
+        assert matcher.match(tid) == expected_match(rules, tid), tid
+
+def test_rules_that_cannot_be_combined():
+    rules = [
+        PatternRule(r'(?P<kind>RR)_(?P<code>[A-Z]{3})', 'rr'),
+        PatternRule(r'(?i)fob_([a-z]+)', 'fob'),
+        PatternRule(r'(?P<kind>FOB)_X', 'named again'),
+        PatternRule(r'([A-Z])_\1', 'backref'),
+        PatternRule(r'A_(\w+)', 'combined'),
+        PatternRule(r'\w+', 'any'),
+    ]
+    matcher = PatternMatcher(rules)
+    for tid in ['RR_ABC', 'FOB_X', 'fob_abc', 'A_A', 'A_B', 'B_B', 'Z_Y', 'plain']:
+        assert matcher.match(tid) == expected_match(rules, tid), tid
+
+if __name__ == '__main__':
+    test_top_level_alternation_has_no_prefix()
+    test_matcher_agrees_with_rules()
+    test_rules_that_cannot_be_combined()
+    print('ok')
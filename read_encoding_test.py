@@ -1,12 +1,12 @@
 import os
-import chardet
 import config
+from text_encoding import sniff_encoding, iter_decoded_lines
 
 for filename in os.listdir(config.TEXT_FILE_DIR):
     if not filename.endswith('.ini'): continue
-    # 先检测文件编码
-    with open(os.path.join(config.TEXT_FILE_DIR, filename), 'rb') as f:
-        raw_data = f.read()
-        result = chardet.detect(raw_data)
-        encoding = result['encoding']
-        print(f"{f} 检测到的编码: {encoding}")
\ No newline at end of file
+    path = os.path.join(config.TEXT_FILE_DIR, filename)
+    # 先检测文件编码，再完整解码一遍检查是否有无法解码的字节
+    encoding = sniff_encoding(path)
+    issues = []
+    for _ in iter_decoded_lines(path, encoding, issues): pass
+    print(f"{path} 检测到的编码: {encoding}, 无法解码的字节序列: {len(issues)}")
@@ -0,0 +1,283 @@
+import os, json, time, lzma, hashlib
+import logging
+
+import config
+
+PATCH_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+# 重复的ID在键后追加该分隔符和序号，保证每一行都有唯一的键
+DUPLICATE_SEP = '\x00'
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def decode_output(data: bytes) -> str:
+    # surrogateescape保证无法解码的字节也能原样还原
+    # 不使用config.ENCODE(utf-8-sig)，BOM作为普通字符保留，否则没有BOM的文件还原后会多出BOM
+    return data.decode('utf-8', 'surrogateescape')
+
+def encode_output(text: str) -> bytes:
+    return text.encode('utf-8', 'surrogateescape')
+
+def split_lines(text: str) -> tuple[list[str], dict[str, str]]:
+    """
+    把输出文件拆成`(键列表, {键: 行中键之后的部分})`
+
+    键为`=`之前的ID，同一ID再次出现时追加序号，没有`=`的行整行作为键
+    最后一个元素是最后一个换行符之后的内容(通常为空)，键为空字符串
+    """
+    keys = list()
+    values = dict()
+    seen = dict()
+    for line in text.split('\n'):
+        tid = line.partition('=')[0]
+        key = tid
+        count = seen.get(tid, 0)
+        if count:
+            key = f"{tid}{DUPLICATE_SEP}{count}"
+        seen[tid] = count + 1
+        keys.append(key)
+        values[key] = line[len(tid):]
+    return keys, values
+
+def join_lines(keys: list[str], values: dict[str, str]) -> str:
+    return '\n'.join(key.partition(DUPLICATE_SEP)[0] + values[key] for key in keys)
+
+def line_hashes(values: dict[str, str]) -> dict[str, bytes]:
+    return {key: hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest() for key, value in values.items()}
+
+def compute_patch(old_text: str, new_text: str) -> dict:
+    """
+    按ID比较两个版本的输出，返回新增、修改和删除的行
+
+    行内容按哈希比较；新增的行记录在新文件中的位置，
+    保留的行相对顺序发生变化时(很少见)额外记录新文件的完整键顺序
+    """
+    old_keys, old_values = split_lines(old_text)
+    new_keys, new_values = split_lines(new_text)
+    old_hashes = line_hashes(old_values)
+    new_hashes = line_hashes(new_values)
+    removed = [key for key in old_keys if key not in new_hashes]
+    changed = {key: new_values[key] for key in new_keys if key in old_hashes and old_hashes[key] != new_hashes[key]}
+    added = [[pos, key, new_values[key]] for pos, key in enumerate(new_keys) if key not in old_hashes]
+    patch = {
+        'format': PATCH_FORMAT,
+        'removed': removed,
+        'changed': changed,
+        'added': added,
+    }
+    retained_old = [key for key in old_keys if key in new_hashes]
+    retained_new = [key for key in new_keys if key in old_hashes]
+    if retained_old != retained_new:
+        patch['order'] = new_keys
+    return patch
+
+def rebuild_text(old_text: str, patch: dict) -> str:
+    if patch.get('format') != PATCH_FORMAT:
+        raise ValueError(f"不支持的补丁格式 {patch.get('format')}")
+    keys, values = split_lines(old_text)
+    for key in patch['removed']:
+        values.pop(key, None)
+    values.update(patch['changed'])
+    for _, key, value in patch['added']:
+        values[key] = value
+    if 'order' in patch:
+        return join_lines(patch['order'], values)
+    removed = set(patch['removed'])
+    keys = [key for key in keys if key not in removed]
+    for pos, key, _ in patch['added']:
+        keys.insert(pos, key)
+    return join_lines(keys, values)
+
+def dump_patch(patch: dict) -> bytes:
+    data = json.dumps(patch, ensure_ascii=False, separators=(',', ':')).encode('utf-8', 'surrogatepass')
+    return lzma.compress(data, preset=config.RELEASE_PATCH_PRESET)
+
+def load_patch(data: bytes) -> dict:
+    return json.loads(lzma.decompress(data).decode('utf-8', 'surrogatepass'))
+
+def apply_patch(base_path: str, patch_path: str, output_path: str) -> str:
+    """
+    用上一版本的文件和补丁还原出新版本的完整文件，返回新文件的sha256
+
+    应用前后分别校验基础文件和结果的sha256，不一致时抛出ValueError，不会写入输出
+    """
+    with open(patch_path, 'rb') as file:
+        patch = load_patch(file.read())
+    with open(base_path, 'rb') as file:
+        base = file.read()
+    base_sha = hashlib.sha256(base).hexdigest()
+    if base_sha != patch['base_sha256']:
+        raise ValueError(f"[PATCH_MISMATCH] {base_path} 不是补丁的基础版本 (sha256 {base_sha[:12]}, 需要 {patch['base_sha256'][:12]})")
+    data = encode_output(rebuild_text(decode_output(base), patch))
+    sha = hashlib.sha256(data).hexdigest()
+    if sha != patch['target_sha256']:
+        raise ValueError(f"[PATCH_MISMATCH] 还原结果校验失败 (sha256 {sha[:12]}, 需要 {patch['target_sha256'][:12]})")
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, output_path)
+    logging.info(f"Patched {base_path} -> {output_path}")
+    return sha
+
+class ReleaseStore():
+
+    """
+    一个输出文件的发布记录(`<release_dir>/<name>/`)
+
+    - `<id>.ini`: 最新发布的完整文件，作为下一次发布的比较基础
+    - `<from>-<to>.patch.xz`: 相邻两次发布之间按ID计算的增量补丁(lzma压缩的JSON)
+    - `manifest.json`: 各次发布和补丁的sha256、大小和行数变化
+
+    发布ID为完整文件sha256的前12位，内容未变化时不产生新的发布
+    """
+
+    def __init__(self, release_dir: str, name: str) -> None:
+        self.folder = os.path.join(release_dir, name)
+        self.manifest_path = os.path.join(self.folder, MANIFEST_NAME)
+        self.manifest = {'name': name, 'latest': None, 'releases': [], 'patches': []}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                    self.manifest = json.load(file)
+            except Exception as e:
+                logging.warning(f"[RELEASE_EXECPTION] {self.manifest_path} 读取失败: {e}")
+
+    def full_path(self, release_id: str) -> str:
+        return os.path.join(self.folder, f"{release_id}.ini")
+
+    def release(self, output_path: str, version: str|None = None) -> dict|None:
+        """
+        发布新生成的输出文件，返回新的补丁记录
+
+        与上一次发布相同或是第一次发布时返回None；补丁写入前会对上一次的文件应用一遍并校验结果
+        """
+        start = time.perf_counter()
+        with open(output_path, 'rb') as file:
+            data = file.read()
+        sha = hashlib.sha256(data).hexdigest()
+        release_id = sha[:12]
+        latest = self.manifest['latest']
+        if latest is not None and latest['sha256'] == sha:
+            logging.info(f"Release {self.manifest['name']} unchanged ({release_id})")
+            return None
+        os.makedirs(self.folder, exist_ok=True)
+        entry = None
+        base_path = None if latest is None else self.full_path(latest['id'])
+        if base_path is not None and os.path.exists(base_path):
+            with open(base_path, 'rb') as file:
+                base = file.read()
+            patch = compute_patch(decode_output(base), decode_output(data))
+            patch.update({
+                'from': latest['id'],
+                'to': release_id,
+                'base_sha256': latest['sha256'],
+                'target_sha256': sha,
+            })
+            patch_data = dump_patch(patch)
+            # 发布前用实际写出的补丁还原一遍
+            if hashlib.sha256(encode_output(rebuild_text(decode_output(base), load_patch(patch_data)))).hexdigest() != sha:
+                raise ValueError(f"[RELEASE_EXECPTION] {self.manifest['name']} 补丁还原校验失败")
+            patch_file = f"{latest['id']}-{release_id}.patch.xz"
+            with open(os.path.join(self.folder, patch_file), 'wb') as file:
+                file.write(patch_data)
+            entry = {
+                'from': latest['id'],
+                'to': release_id,
+                'file': patch_file,
+                'sha256': hashlib.sha256(patch_data).hexdigest(),
+                'size': len(patch_data),
+                'added': len(patch['added']),
+                'changed': len(patch['changed']),
+                'removed': len(patch['removed']),
+            }
+            self.manifest['patches'].append(entry)
+            logging.info(
+                f"Release patch {patch_file}: +{entry['added']} ~{entry['changed']} -{entry['removed']}, "
+                f"{len(patch_data) / 1024:.1f}KB ({len(patch_data) / max(len(data), 1):.2%} of full file)"
+            )
+        elif latest is not None:
+            logging.warning(f"[RELEASE_EXECPTION] 找不到上一次发布的文件 {base_path}，无法生成补丁")
+
+        with open(self.full_path(release_id), 'wb') as file:
+            file.write(data)
+        if latest is not None and base_path is not None and os.path.exists(base_path):
+            os.remove(base_path)
+        release = {
+            'id': release_id,
+            'version': version,
+            'sha256': sha,
+            'size': len(data),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.manifest['releases'].append(release)
+        self.manifest['latest'] = release
+        self.save()
+        logging.info(f"Released {self.manifest['name']} {release_id} in {time.perf_counter() - start:.3f}s")
+        return entry
+
+    def patch_chain(self, from_id: str) -> list[dict]:
+        """从`from_id`升级到最新发布需要依次应用的补丁"""
+        chain = list()
+        by_from = {patch['from']: patch for patch in self.manifest['patches']}
+        latest = self.manifest['latest']
+        current = from_id
+        while latest is not None and current != latest['id']:
+            patch = by_from.get(current)
+            if patch is None:
+                raise KeyError(f"没有从 {current} 开始的补丁")
+            chain.append(patch)
+            current = patch['to']
+        return chain
+
+    def save(self) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.manifest, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+def release_outputs(output_paths: list[str], release_dir: str = config.RELEASE_DIR, version: str|None = None) -> list[dict|None]:
+    """发布各输出文件，发布名称为输出文件名(不含扩展名)"""
+    results = list()
+    for output_path in output_paths:
+        name = os.path.splitext(os.path.basename(output_path))[0]
+        results.append(ReleaseStore(release_dir, name).release(output_path, version))
+    return results
+
+def main(argv: list[str]|None = None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='run.py apply-patch', description='用上一版本的文件和增量补丁还原新版本的完整文件')
+    parser.add_argument('base', help='上一版本的完整文件')
+    parser.add_argument('patches', nargs='*', help='按顺序应用的补丁(.patch.xz)')
+    parser.add_argument('--from', dest='from_id', metavar='ID', help='base的发布ID，按发布记录依次应用升级到最新发布的所有补丁')
+    parser.add_argument('--release-dir', default=config.RELEASE_DIR, help=f"发布目录(默认{config.RELEASE_DIR})，与--from一起使用")
+    parser.add_argument('--name', help='发布名称，默认为base的文件名(不含扩展名)')
+    parser.add_argument('-o', '--output', help='输出路径，默认覆盖base')
+    args = parser.parse_args(argv)
+
+    patches = list(args.patches)
+    if args.from_id is not None:
+        if len(patches):
+            parser.error('--from 不能与补丁列表同时使用')
+        store = ReleaseStore(args.release_dir, args.name or os.path.splitext(os.path.basename(args.base))[0])
+        try:
+            patches = [os.path.join(store.folder, patch['file']) for patch in store.patch_chain(args.from_id)]
+        except KeyError as e:
+            parser.error(e.args[0])
+        if len(patches) == 0:
+            logging.info(f"{args.base} is already the latest release")
+    elif len(patches) == 0:
+        parser.error('需要提供补丁或--from')
+
+    output = args.output or args.base
+    base = args.base
+    for patch_path in patches:
+        apply_patch(base, patch_path, output)
+        base = output
+    if len(patches) == 0 and output != args.base:
+        import shutil
+        shutil.copyfile(args.base, output)
@@ -0,0 +1,45 @@
+import hashlib
+
+from release_patch import compute_patch, rebuild_text, dump_patch, load_patch, decode_output, encode_output, apply_patch, ReleaseStore
+
+# 任何补丁应用到基础版本后都必须逐字节还原出新版本
+
+def round_trip(old: bytes, new: bytes) -> dict:
+    old_text, new_text = decode_output(old), decode_output(new)
+    patch = load_patch(dump_patch(compute_patch(old_text, new_text)))
+    assert encode_output(rebuild_text(old_text, patch)) == new
+    return patch
+
+def test_duplicate_ids():
+    old = b'A=1\nB=2\nA=3\nC=4\n'
+    patch = round_trip(old, b'A=1\nB=2\nA=changed\nC=4\nA=5\n')
+    assert len(patch['changed']) == 1 and len(patch['added']) == 1 and 'order' not in patch
+    round_trip(old, b'B=2\nA=3\nC=4\n')
+    round_trip(old, b'A=1\nA=1\nA=1\nB=2\n')
+
+def test_reordering():
+    old = b'A=1\nB=2\nC=3\nD=4'
+    patch = round_trip(old, b'C=3\nA=1\nE=5\nB=2\nD=4')
+    assert 'order' in patch
+    round_trip(old, b'D=4\nC=3\nB=2\nA=1\n')
+    round_trip(old, b'no separator\nA=1\n\nB=2')
+
+def test_surrogate_escaped_bytes():
+    old = b'\xef\xbb\xbfA=caf\xc3\xa9\nB=\xff\xfe broken\nC=3\r\n'
+    patch = round_trip(old, b'\xef\xbb\xbfA=caf\xc3\xa9\nB=\xff\xfd broken\nC=3\r\nD=\x80\n')
+    assert len(patch['changed']) == 1 and len(patch['added']) == 1
+    round_trip(old, b'A=\xc3\nB=\xff\xfe broken\n')
+
+def test_release_and_apply(tmp_path):
+    versions = [b'A=1\nB=2\nA=3\n', b'A=1\nB=\xff\nA=3\nC=4\n', b'C=4\nA=1\nA=3\n']
+    output = tmp_path / 'global.ini'
+    store = ReleaseStore(str(tmp_path / 'releases'), 'global')
+    for data in versions:
+        output.write_bytes(data)
+        store.release(str(output))
+    first = hashlib.sha256(versions[0]).hexdigest()[:12]
+    base = tmp_path / 'base.ini'
+    base.write_bytes(versions[0])
+    for patch in store.patch_chain(first):
+        apply_patch(str(base), f"{store.folder}/{patch['file']}", str(base))
+    assert base.read_bytes() == versions[-1]
@@ -0,0 +1,74 @@
+import string
+from typing import Any, Callable
+
+# 翻译时才知道的字段，其余字段在抓取数据时就填入模板
+DYNAMIC_FIELDS = ('en', 'cn', 'id')
+
+class CompiledTemplate():
+
+    """
+    预编译的输出模板
+
+    模板只解析一次，`bind`在抓取数据时把物品字段填入模板，得到只剩`{en}`/`{cn}`/`{id}`
+    空位的字面量元组，翻译时`render`只需要按顺序拼接
+    """
+
+    def __init__(self, template: str) -> None:
+        self.template = template
+        # [(字面量, 字段名, 格式, 转换)]
+        self.segments = list(string.Formatter().parse(template))
+        self.slots = tuple(DYNAMIC_FIELDS.index(field) for _, field, _, _ in self.segments if field in DYNAMIC_FIELDS)
+        self.fields = [field for _, field, _, _ in self.segments if field is not None and field not in DYNAMIC_FIELDS]
+        self.render = self.__compile_render()
+
+    def bind(self, values: dict[str, Any]) -> tuple[str, ...]:
+        """填入物品字段，返回长度为`len(slots) + 1`的字面量元组"""
+        literals = []
+        current = []
+        for literal, field, spec, conversion in self.segments:
+            current.append(literal)
+            if field is None: continue
+            if field in DYNAMIC_FIELDS:
+                literals.append(''.join(current))
+                current = []
+                continue
+            value = values[field]
+            if conversion == 'r': value = repr(value)
+            elif conversion == 's': value = str(value)
+            current.append(format(value, spec or ''))
+        literals.append(''.join(current))
+        return tuple(literals)
+
+    def __compile_render(self) -> Callable[[tuple[str, ...], tuple[str, str, str]], str]:
+        slots = self.slots
+        if slots == (0, 1):
+            # 最常见的 en 在前 cn 在后
+            return lambda literals, values: f"{literals[0]}{values[0]}{literals[1]}{values[1]}{literals[2]}"
+        if len(slots) == 0:
+            return lambda literals, values: literals[0]
+        def render(literals, values):
+            parts = [literals[0]]
+            for i, slot in enumerate(slots):
+                parts.append(values[slot])
+                parts.append(literals[i + 1])
+            return ''.join(parts)
+        return render
+
+def compile_extractor(fields: dict[str, dict], transforms: dict[str, Callable[[Any], Any]]) -> Callable[[dict], dict]:
+    """
+    编译字段提取，`fields`为`{名称: {'field': API字段, 'transform': [变换, ...]}}`
+    返回从API数据中提取`{名称: 值}`的函数
+    """
+    steps = []
+    for name, spec in fields.items():
+        funcs = tuple(transforms[t] for t in spec.get('transform', []))
+        steps.append((name, spec['field'], funcs))
+    def extract(data: dict) -> dict:
+        values = dict()
+        for name, field, funcs in steps:
+            value = data[field]
+            for func in funcs:
+                value = func(value)
+            values[name] = value
+        return values
+    return extract
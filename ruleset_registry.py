@@ -0,0 +1,72 @@
+import os, json
+import importlib
+import logging
+from typing import Type
+
+import config
+
+# 内置规则集 名称 -> "模块:类名"，只在使用时导入
+BUILTIN_RULESETS = {
+    'GeneralReplaceRuleset': 'local_ruleset:GeneralReplaceRuleset',
+    'CstoneFoodAndDrink': 'cstone_ruleset:CstoneFoodAndDrink',
+    'BombRuleset': 'local_ruleset:BombRuleset',
+    'LocationPatternRuleset': 'local_ruleset:LocationPatternRuleset',
+    'TextSubstitutionRuleset': 'local_ruleset:TextSubstitutionRuleset',
+}
+
+# 默认构建的规则集，按优先级排列
+DEFAULT_RULESETS = [
+    'GeneralReplaceRuleset',
+    'CstoneFoodAndDrink',
+    'CstoneMissile',
+    'CstoneShipParts',
+    'BombRuleset',
+    # 改写所有输出文本，不声明ID
+    'TextSubstitutionRuleset',
+]
+
+# 需要抓取cstone数据(依赖requests)的模块
+NETWORK_MODULES = {'cstone_ruleset'}
+
+def definition_rulesets(folder: str = config.RULESET_DEFINITION_DIR) -> dict[str, str]:
+    """custom/rulesets中定义的规则集，只读取定义文件中的名称(参见 cstone_ruleset.DeclarativeCstoneRuleset)"""
+    rulesets = dict()
+    if not os.path.isdir(folder): return rulesets
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith('.json'): continue
+        try:
+            with open(os.path.join(folder, filename), 'r', encoding='utf-8') as file:
+                name = json.load(file)['name']
+        except Exception as e:
+            logging.warning(f"[REGISTRY_EXECPTION] {filename} 读取失败: {e}")
+            continue
+        rulesets[name] = f"cstone_ruleset:{name}"
+    return rulesets
+
+def available_rulesets() -> dict[str, str]:
+    """
+    所有可用的规则集 `{名称: "模块:类名"}`，不导入任何规则集模块
+
+    来源依次为内置规则集、custom/rulesets中的定义文件和`config.RULESET_PLUGINS`，
+    同名时后者覆盖前者
+    """
+    rulesets = dict(BUILTIN_RULESETS)
+    rulesets.update(definition_rulesets())
+    rulesets.update(config.RULESET_PLUGINS)
+    return rulesets
+
+def requires_network(spec: str) -> bool:
+    return spec.partition(':')[0] in NETWORK_MODULES
+
+def load_ruleset(name: str, rulesets: dict[str, str]|None = None) -> Type:
+    """按名称导入规则集类，只导入它所在的模块"""
+    rulesets = rulesets if rulesets is not None else available_rulesets()
+    spec = rulesets.get(name)
+    if spec is None:
+        raise KeyError(f"未知的规则集 {name}，可用的规则集: {', '.join(rulesets)}")
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+def load_rulesets(names: list[str]) -> list[Type]:
+    rulesets = available_rulesets()
+    return [load_ruleset(name, rulesets) for name in names]
@@ -0,0 +1,139 @@
+import codecs
+import logging
+import threading
+from typing import Iterator
+
+import config
+
+# BOM和对应的编码，UTF-32LE的BOM以UTF-16LE的BOM开头，需要先检查
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+class DecodeIssue():
+
+    """无法解码的字节序列，`line`从1开始，`offset`为在文件中的字节偏移"""
+
+    def __init__(self, path: str, line: int|None, offset: int, data: bytes) -> None:
+        self.path = path
+        self.line = line
+        self.offset = offset
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"{self.path}:{self.line if self.line is not None else '?'} @{self.offset}: {self.data!r}"
+
+_local = threading.local()
+
+def _report_error(exc: UnicodeDecodeError):
+    """解码的错误处理函数，记录错误位置并替换为REPLACE_CHR"""
+    _local.errors.append((exc.start, exc.object[exc.start:exc.end]))
+    return config.REPLACE_CHR, exc.end
+
+codecs.register_error('sc_report', _report_error)
+
+def _decode(decode, *args) -> tuple[str, list[tuple[int, bytes]]]:
+    _local.errors = errors = list()
+    return decode(*args), errors
+
+def _try_decode(sample: bytes, encoding: str, final: bool) -> bool:
+    try:
+        codecs.getincrementaldecoder(encoding)('strict').decode(sample, final)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def sniff_encoding(path: str, sample_size: int = config.ENCODING_SAMPLE_SIZE) -> str:
+    """
+    根据文件开头的一段样本判断编码
+
+    依次检查：BOM、严格的UTF-8校验、UTF-16(没有BOM时按NUL字节的分布判断)、GB18030
+    都不符合时返回config.ENCODE
+    """
+    with open(path, 'rb') as file:
+        sample = file.read(sample_size)
+    final = len(sample) < sample_size
+    for bom, encoding in BOMS:
+        if sample.startswith(bom): return encoding
+    if _try_decode(sample, 'utf-8', final): return 'utf-8'
+    # 没有BOM的UTF-16中，ASCII字符的高位字节为NUL
+    half = max(len(sample) // 2, 1)
+    if sample[1::2].count(0) > half * 0.3: return 'utf-16-le'
+    if sample[0::2].count(0) > half * 0.3: return 'utf-16-be'
+    # 只有个别损坏字节的UTF-8仍按UTF-8处理，否则GB18030可能会把它整体误判
+    text, errors = _decode(codecs.getincrementaldecoder('utf-8')('sc_report').decode, sample, final)
+    if len(errors) * 1000 < len(sample): return 'utf-8'
+    if _try_decode(sample, 'gb18030', final): return 'gb18030'
+    return config.ENCODE
+
+def _is_ascii_compatible(encoding: str) -> bool:
+    # 换行符编码后仍是单字节\n的编码可以按字节行切分
+    return codecs.lookup(encoding).name == 'utf-8-sig' or '\n'.encode(encoding) == b'\n'
+
+def _split_line(line: str) -> list[str]:
+    # 与文本模式的通用换行一致，`\r\n`、`\n`和单独的`\r`都是换行符
+    line = line.removesuffix('\n').removesuffix('\r')
+    return line.split('\r') if '\r' in line else [line]
+
+def iter_decoded_lines(path: str, encoding: str|None = None, issues: list[DecodeIssue]|None = None) -> Iterator[str]:
+    """
+    流式读取并解码文件，产出不含换行符的行，与文本模式相同，单独的CR也视为换行
+
+    编码为None时自动检测(参见 sniff_encoding)
+    无法解码的字节替换为REPLACE_CHR，并记录行号和字节偏移到`issues`，同时输出警告日志
+    """
+    encoding = encoding or sniff_encoding(path)
+    reported = 0
+
+    def report(line: int|None, offset: int, data: bytes):
+        nonlocal reported
+        issue = DecodeIssue(path, line, offset, data)
+        if issues is not None:
+            issues.append(issue)
+        if reported < config.DECODE_ERROR_LOG_LIMIT:
+            logging.warning(f"[DECODE_ERROR] {issue} ({encoding})")
+        reported += 1
+
+    if _is_ascii_compatible(encoding):
+        line_encoding = 'utf-8' if codecs.lookup(encoding).name == 'utf-8-sig' else encoding
+        with open(path, 'rb') as file:
+            offset = 0
+            for line_no, raw in enumerate(file, 1):
+                start = 0
+                if line_no == 1 and raw.startswith(codecs.BOM_UTF8) and line_encoding == 'utf-8':
+                    start = len(codecs.BOM_UTF8)
+                try:
+                    line = raw[start:].decode(line_encoding)
+                except UnicodeDecodeError:
+                    line, errors = _decode(raw[start:].decode, line_encoding, 'sc_report')
+                    for pos, data in errors:
+                        report(line_no, offset + start + pos, data)
+                offset += len(raw)
+                yield from _split_line(line)
+    else:
+        # UTF-16/32不能按字节切分行，分块增量解码，只能报告字节偏移
+        decoder = codecs.getincrementaldecoder(encoding)('sc_report')
+        pending = ''
+        consumed = 0
+        with open(path, 'rb') as file:
+            while True:
+                chunk = file.read(1 << 20)
+                buffered = len(decoder.getstate()[0])
+                text, errors = _decode(decoder.decode, chunk, len(chunk) == 0)
+                for pos, data in errors:
+                    report(None, consumed - buffered + pos, data)
+                consumed += len(chunk)
+                lines = (pending + text).split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    yield from _split_line(line)
+                if len(chunk) == 0: break
+        if pending:
+            yield from _split_line(pending)
+
+    if reported > config.DECODE_ERROR_LOG_LIMIT:
+        logging.warning(f"[DECODE_ERROR] {path}: {reported} undecodable sequences in total")
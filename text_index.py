@@ -0,0 +1,247 @@
+import os, re, time, marshal
+from bisect import bisect_left
+import argparse
+import logging
+from array import array
+from collections import Counter
+
+import config
+from text_store import TextStore
+
+# 索引格式版本，修改分词方式时需要增加
+INDEX_VERSION = 1
+# 候选数不超过VERIFY_LIMIT，或下一个词的倒排表比候选多VERIFY_RATIO倍以上时不再求交集，直接检查原文
+VERIFY_LIMIT = 256
+VERIFY_RATIO = 8
+
+_WORD = re.compile(r'[a-z0-9]+')
+_CJK = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+# 英文单词和CJK片段，其余字符都是分隔符
+_RUN = re.compile(r'[a-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+
+def cjk_grams(run: str) -> list[str]:
+    """CJK片段的单字和相邻二字组"""
+    return list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+
+def tokenize(text: str) -> set[str]:
+    """文本的英文单词(小写)、CJK单字和二字组"""
+    text = text.lower()
+    tokens = set(_WORD.findall(text))
+    for run in _CJK.findall(text):
+        tokens.update(cjk_grams(run))
+    return tokens
+
+def prefix_range(words: list[str], prefix: str) -> list[str]:
+    """有序列表中以`prefix`开头的词"""
+    return words[bisect_left(words, prefix):bisect_left(words, prefix + '\x7f')]
+
+def id_facet(tid: str) -> str:
+    """ID的分面，为第一个`_`之前的部分(小写)，如`item_Name...`为`item`"""
+    return tid.partition('_')[0].lower()
+
+class TextIndex():
+
+    """
+    en/cn/ref文本的倒排索引
+
+    英文按单词、中文按单字和二字组建立索引，所有语言共用一个有序词表`tokens`，
+    每种语言的倒排表拼接为一段字节`data`，`offsets[i]`为第i个词的倒排表在其中的位置
+    查询时用索引找出包含所有词的候选ID，再对候选检查原文是否包含查询文本(不区分大小写)，
+    结果与逐条扫描完全一致；查询开头/结尾的英文单词可能只是文本中单词的一部分，按前后缀展开
+    按文本指纹缓存到磁盘，加载时只需读取几个大对象，查询时只解码用到的倒排表
+    """
+
+    def __init__(
+        self,
+        store: TextStore,
+        tokens: list[str],
+        reversed_words: list[str],
+        tables: dict[str, tuple[bytes, bytes]]
+    ) -> None:
+        self.store = store
+        self.tokens = tokens
+        # ASCII字符排在CJK之前，词表开头的部分即为英文单词
+        self.words = tokens[:bisect_left(tokens, '\x80')]
+        self.reversed_words = reversed_words    # 英文单词倒序后排序，按后缀展开时使用
+        self.tables = tables
+        self.offsets: dict[str, array] = dict()
+        for lang, (offsets, _) in tables.items():
+            self.offsets[lang] = array('I')
+            self.offsets[lang].frombytes(offsets)
+
+    @classmethod
+    def build(cls, store: TextStore) -> 'TextIndex':
+        start = time.perf_counter()
+        postings: dict[str, dict[str, array]] = dict()
+        for lang in store.langs:
+            table = postings[lang] = dict()
+            for idx, text in enumerate(store.columns[lang]):
+                if not text: continue
+                for token in tokenize(text):
+                    posting = table.get(token)
+                    if posting is None:
+                        table[token] = array('I', (idx,))
+                    else:
+                        posting.append(idx)
+        tokens = sorted(set().union(*postings.values()))
+        tables = dict()
+        empty = array('I')
+        for lang, table in postings.items():
+            offsets = array('I', (0,))
+            chunks = list()
+            for token in tokens:
+                chunk = table.get(token, empty).tobytes()
+                chunks.append(chunk)
+                offsets.append(offsets[-1] + len(chunk))
+            tables[lang] = (offsets.tobytes(), b''.join(chunks))
+        reversed_words = sorted(token[::-1] for token in tokens if token.isascii())
+        logging.info(f"Built text index ({len(tokens)} tokens) in {time.perf_counter() - start:.2f}s")
+        return cls(store, tokens, reversed_words, tables)
+
+    @classmethod
+    def open(cls, store: TextStore, cache_path: str = config.TEXT_INDEX_PATH) -> 'TextIndex':
+        """按文本指纹加载缓存的索引，没有或已过期时重新建立并保存"""
+        key = None if store.fingerprint is None else (INDEX_VERSION, store.fingerprint, store.langs)
+        if key is not None and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as file:
+                    cached_key, tokens, reversed_words, tables = marshal.load(file)
+                if cached_key == key:
+                    logging.info(f"Loaded text index {cache_path}")
+                    return cls(store, tokens, reversed_words, tables)
+            except Exception as e:
+                logging.warning(f"[INDEX_EXECPTION] {cache_path} 读取失败: {e}")
+        index = cls.build(store)
+        if key is not None:
+            try:
+                os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+                tmp_path = f"{cache_path}.tmp"
+                with open(tmp_path, 'wb') as file:
+                    marshal.dump((key, index.tokens, index.reversed_words, index.tables), file)
+                os.replace(tmp_path, cache_path)
+            except Exception as e:
+                logging.warning(f"[INDEX_EXECPTION] {cache_path} 写入失败: {e}")
+        return index
+
+    def __span(self, lang: str, token: str) -> tuple[int, int]:
+        """词的倒排表在`data`中的范围，不存在时为空范围"""
+        pos = bisect_left(self.tokens, token)
+        if pos == len(self.tokens) or self.tokens[pos] != token: return 0, 0
+        offsets = self.offsets[lang]
+        return offsets[pos], offsets[pos + 1]
+
+    def __size(self, lang: str, tokens: list[str]) -> int:
+        """几个词的倒排表的总长度"""
+        size = 0
+        for token in tokens:
+            start, end = self.__span(lang, token)
+            size += end - start
+        return size // array('I').itemsize
+
+    def __posting(self, lang: str, token: str) -> array:
+        start, end = self.__span(lang, token)
+        posting = array('I')
+        posting.frombytes(self.tables[lang][1][start:end])
+        return posting
+
+    def __words(self, word: str, open_start: bool, open_end: bool) -> list[str]:
+        """查询两端的英文单词可能只是文本中单词的一部分，返回所有可能的词"""
+        if not open_start and not open_end: return [word]
+        if open_start and open_end:
+            return [token for token in self.words if word in token]
+        if open_end:
+            return prefix_range(self.words, word)
+        return [token[::-1] for token in prefix_range(self.reversed_words, word[::-1])]
+
+    def parse(self, query: str) -> list[list[str]]:
+        """把查询拆成词，每个词为可能对应的索引词列表，文本需要包含每个词中的任意一个"""
+        query = query.lower()
+        terms = list()
+        for m in _RUN.finditer(query):
+            run = m.group()
+            if _WORD.fullmatch(run):
+                terms.append(self.__words(run, m.start() == 0, m.end() == len(query)))
+            elif len(run) == 1:
+                terms.append([run])
+            else:
+                terms.extend([run[i:i + 2]] for i in range(len(run) - 1))
+        return terms
+
+    def candidates(self, lang: str, terms: list[list[str]]) -> set[int]|None:
+        """
+        包含所有词的下标，没有可索引的词时返回None
+        按倒排表从短到长求交集，候选足够少时提前结束，剩下的由原文检查
+        """
+        if len(terms) == 0: return None
+        sized = sorted((self.__size(lang, tokens), tokens) for tokens in terms)
+        result = None
+        for size, tokens in sized:
+            if result is not None and (len(result) <= VERIFY_LIMIT or size > len(result) * VERIFY_RATIO): break
+            matched = set()
+            for token in tokens:
+                posting = self.__posting(lang, token)
+                matched.update(posting if result is None else result.intersection(posting))
+            result = matched
+        return result
+
+    def search(
+        self,
+        query: str,
+        langs: tuple[str, ...]|None = None,
+        prefix: str|None = None,
+        limit: int|None = None
+    ) -> list[tuple[int, str]]:
+        """
+        查找文本包含`query`(不区分大小写)的ID，返回按下标排序的`[(下标, 语言)]`
+        `prefix`为ID前缀(不区分大小写)，`query`为空时返回该前缀的所有ID
+        """
+        langs = langs or self.store.langs
+        prefix = prefix.upper() if prefix else None
+        needle = query.lower()
+        terms = self.parse(needle)
+        hits = list()
+        for lang in langs:
+            column = self.store.columns[lang]
+            candidates = self.candidates(lang, terms)
+            indices = range(len(column)) if candidates is None else sorted(candidates)
+            for idx in indices:
+                text = column[idx]
+                if text is None or needle not in text.lower(): continue
+                if prefix is not None and not self.store.ids[idx].upper().startswith(prefix): continue
+                hits.append((idx, lang))
+        order = {lang: i for i, lang in enumerate(langs)}
+        hits.sort(key=lambda hit: (hit[0], order[hit[1]]))
+        return hits[:limit] if limit is not None else hits
+
+    def facets(self, hits: list[tuple[int, str]]) -> Counter:
+        """按ID分面统计结果数(参见 id_facet)"""
+        return Counter(id_facet(self.store.ids[idx]) for idx in {idx for idx, _ in hits})
+
+def open_index(text_dir: str = config.TEXT_FILE_DIR) -> TextIndex:
+    """加载文本目录(包含en/cn/ref.ini)的索引"""
+    store = TextStore.from_files({lang: os.path.join(text_dir, f"{lang}.ini") for lang in TextStore.LANGS})
+    return TextIndex.open(store)
+
+def main(argv: list[str]|None = None):
+    parser = argparse.ArgumentParser(prog='run.py search', description='按文本内容查找ID(不区分大小写)')
+    parser.add_argument('query', nargs='?', default='', help='查找的文本，为空时列出--prefix下的所有ID')
+    parser.add_argument('--text-dir', default=config.TEXT_FILE_DIR, help='包含en/cn/ref.ini的目录')
+    parser.add_argument('--lang', nargs='+', choices=TextStore.LANGS, help='查找的语言，默认全部')
+    parser.add_argument('--prefix', help='只查找以此开头的ID')
+    parser.add_argument('--limit', type=int, default=50, help='最多显示的条数')
+    parser.add_argument('--facets', action='store_true', help='按ID前缀统计结果数')
+    args = parser.parse_args(argv)
+    if not args.query and not args.prefix:
+        parser.error('需要提供查找的文本或--prefix')
+
+    index = open_index(args.text_dir)
+    start = time.perf_counter()
+    hits = index.search(args.query, tuple(args.lang) if args.lang else None, args.prefix)
+    logging.info(f"Found {len(hits)} matches in {(time.perf_counter() - start) * 1000:.1f}ms")
+    for idx, lang in hits[:args.limit]:
+        print(f"{index.store.ids[idx]}\t[{lang}] {index.store.columns[lang][idx]}")
+    if len(hits) > args.limit:
+        print(f"... {len(hits) - args.limit} more")
+    if args.facets:
+        for facet, count in index.facets(hits).most_common():
+            print(f"{count:>8}  {facet}")
@@ -0,0 +1,178 @@
+import os, sys, json
+import marshal, hashlib
+import logging
+from typing import Iterable
+
+import config
+from utils import iter_ini_file
+
+# 缺失文本的标记
+MISSING = None
+
+# 快照格式版本，修改存储结构时需要增加
+SNAPSHOT_VERSION = 1
+
+class TextStore():
+
+    """
+    en/cn/ref文本的列式存储
+
+    所有ID只保存一份(intern后的字符串)，`index`是大写ID到下标的唯一索引，
+    各语言的文本按下标存放在平行的列表中，缺失的文本为`MISSING`
+    仅大小写不同的ID视为同一个ID，保留最先出现的写法
+    """
+
+    LANGS = ('en', 'cn', 'ref')
+
+    def __init__(self, langs: Iterable[str] = LANGS) -> None:
+        self.langs = tuple(langs)
+        self.ids: list[str] = []
+        self.index: dict[str, int] = dict()
+        self.columns: dict[str, list[str|None]] = {lang: [] for lang in self.langs}
+        # 源文件内容的哈希，从文件加载时设置
+        self.fingerprint: str|None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, tid: str) -> bool:
+        return tid.upper() in self.index
+
+    def add(self, lang: str, tid: str, text: str) -> int:
+        key = tid.upper()
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.ids)
+            self.ids.append(sys.intern(tid))
+            self.index[sys.intern(key)] = idx
+            for column in self.columns.values():
+                column.append(MISSING)
+        self.columns[lang][idx] = text
+        return idx
+
+    def load(self, lang: str, items: Iterable[tuple[str, str]]) -> None:
+        for tid, text in items:
+            self.add(lang, tid, text)
+
+    def find(self, tid: str) -> int|None:
+        return self.index.get(tid.upper())
+
+    def text(self, idx: int, lang: str) -> str|None:
+        return self.columns[lang][idx]
+
+    @classmethod
+    def from_files(cls, file_map: dict[str, str], use_snapshot: bool = config.SNAPSHOT_CACHE) -> 'TextStore':
+        """
+        从`{lang: 文件路径}`加载，文件未变化时使用快照
+        不使用快照时也按文件内容计算指纹，ID解析和全文索引的缓存以此为键
+        """
+        snapshot = TextSnapshot(file_map) if use_snapshot else None
+        if snapshot is not None:
+            store = snapshot.load()
+            if store is not None: return store
+        store = cls(file_map.keys())
+        for key, filename in file_map.items():
+            logging.info(f"Reading {filename}")
+            store.load(key, iter_ini_file(filename))
+        if snapshot is not None:
+            snapshot.save(store)
+        else:
+            store.fingerprint = files_fingerprint({lang: file_hash(path) for lang, path in file_map.items()})
+        return store
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def files_fingerprint(hashes: dict[str, str]) -> str:
+    """各语言文件内容哈希`{lang: sha1}`合成的文本指纹"""
+    return hashlib.sha1(''.join(hashes[lang] for lang in sorted(hashes)).encode('utf-8')).hexdigest()
+
+class TextSnapshot():
+
+    """
+    TextStore的二进制快照
+
+    以文件路径为键，`<key>.json`记录每个源文件的大小、修改时间和内容哈希，
+    `<key>.bin`为marshal序列化的ID顺序、大写ID索引和各语言文本，加载时整体读入后反序列化
+    大小和修改时间一致时直接认为未变化，否则再比较内容哈希
+    """
+
+    def __init__(self, file_map: dict[str, str], cache_dir: str = config.SNAPSHOT_CACHE_DIR) -> None:
+        self.file_map = {lang: os.path.abspath(path) for lang, path in file_map.items()}
+        key = hashlib.sha1(json.dumps(self.file_map, sort_keys=True).encode('utf-8')).hexdigest()
+        self.meta_path = os.path.join(cache_dir, f"{key}.json")
+        self.data_path = os.path.join(cache_dir, f"{key}.bin")
+        self.cache_dir = cache_dir
+
+    def __stat(self, path: str) -> dict:
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def __check(self) -> dict|None:
+        """检查快照是否有效，有效则返回(可能更新过修改时间的)元数据"""
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.data_path)): return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except Exception as e:
+            logging.warning(f"[SNAPSHOT_EXECPTION] {self.meta_path} 读取失败: {e}")
+            return None
+        if meta.get('version') != SNAPSHOT_VERSION or meta.get('files', {}).keys() != self.file_map.keys(): return None
+        touched = False
+        for lang, path in self.file_map.items():
+            record = meta['files'][lang]
+            stat = self.__stat(path)
+            if stat['size'] != record['size']: return None
+            if stat['mtime'] != record['mtime']:
+                if file_hash(path) != record['hash']: return None
+                record['mtime'] = stat['mtime']
+                touched = True
+        if touched:
+            self.__write_meta(meta)
+        return meta
+
+    def load(self) -> TextStore|None:
+        meta = self.__check()
+        if meta is None: return None
+        try:
+            with open(self.data_path, 'rb') as file:
+                version, langs, ids, index, columns = marshal.loads(file.read())
+        except Exception as e:
+            logging.warning(f"[SNAPSHOT_EXECPTION] {self.data_path} 读取失败: {e}")
+            return None
+        if version != SNAPSHOT_VERSION: return None
+        store = TextStore(langs)
+        store.ids = ids
+        store.index = index
+        store.columns = columns
+        store.fingerprint = meta['fingerprint']
+        logging.info(f"Loaded snapshot {self.data_path}")
+        return store
+
+    def save(self, store: TextStore) -> None:
+        files = dict()
+        for lang, path in self.file_map.items():
+            files[lang] = {**self.__stat(path), 'hash': file_hash(path)}
+        fingerprint = files_fingerprint({lang: record['hash'] for lang, record in files.items()})
+        store.fingerprint = fingerprint
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            content = marshal.dumps((SNAPSHOT_VERSION, store.langs, store.ids, store.index, store.columns))
+            tmp_path = f"{self.data_path}.tmp"
+            with open(tmp_path, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, self.data_path)
+            self.__write_meta({'version': SNAPSHOT_VERSION, 'files': files, 'fingerprint': fingerprint})
+            logging.info(f"Saved snapshot {self.data_path}")
+        except Exception as e:
+            logging.warning(f"[SNAPSHOT_EXECPTION] {self.data_path} 写入失败: {e}")
+
+    def __write_meta(self, meta: dict) -> None:
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(meta, file, indent=2)
+        os.replace(tmp_path, self.meta_path)
@@ -0,0 +1,139 @@
+import os, re
+import logging
+
+import config
+from base_ruleset import BaseRuleset
+from utils import iter_file_lines
+
+# 连续的空格/制表符
+_SPACES = re.compile(r'[ \t]+')
+
+def normalize_spaces(text: str) -> str:
+    """连续的空白合并为一个空格并去掉首尾空白"""
+    return _SPACES.sub(' ', text).strip()
+
+class AhoCorasick():
+
+    """
+    多个字面量的Aho-Corasick自动机
+
+    所有模式编译成一个带失败链接的字典树，文本只需从左到右扫描一遍，
+    耗时与文本长度(加上匹配数)成正比，与模式数量无关
+    不含任何模式首字符的文本由正则字符类在C中直接跳过
+    """
+
+    def __init__(self, patterns: list[str]) -> None:
+        self.patterns = patterns
+        self.goto: list[dict[str, int]] = [dict()]
+        self.fail: list[int] = [0]
+        self.output: list[int] = [-1]     # 在该状态结束的模式(最长的一个)
+        self.link: list[int] = [0]        # 沿失败链接的下一个有输出的状态，0为没有
+        for i, pattern in enumerate(patterns):
+            if len(pattern) == 0: continue
+            state = 0
+            for c in pattern:
+                nxt = self.goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append(dict())
+                    self.fail.append(0)
+                    self.output.append(-1)
+                    self.link.append(0)
+                    self.goto[state][c] = nxt
+                state = nxt
+            if self.output[state] < 0:
+                self.output[state] = i
+        # 按广度优先计算失败链接
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for c, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(c, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                fail = self.fail[nxt]
+                self.link[nxt] = fail if self.output[fail] >= 0 else self.link[fail]
+        first_chars = {pattern[0] for pattern in patterns if len(pattern)}
+        self.start = re.compile(f"[{''.join(re.escape(c) for c in sorted(first_chars))}]") if first_chars else None
+
+    def find_all(self, text: str) -> list[tuple[int, int, int]]:
+        """所有(可能重叠的)匹配 `[(起始, 结束, 模式下标)]`"""
+        if self.start is None: return []
+        m = self.start.search(text)
+        if m is None: return []
+        goto, fail, output, link, patterns = self.goto, self.fail, self.output, self.link, self.patterns
+        matches = list()
+        state = 0
+        # 第一个可能的匹配之前的字符不会进入任何状态
+        for pos in range(m.start(), len(text)):
+            c = text[pos]
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            hit = state if output[state] >= 0 else link[state]
+            while hit:
+                i = output[hit]
+                matches.append((pos + 1 - len(patterns[i]), pos + 1, i))
+                hit = link[hit]
+        return matches
+
+    def replace(self, text: str, replacements: list[str]) -> str:
+        """按最左最长的原则替换不重叠的匹配"""
+        matches = self.find_all(text)
+        if len(matches) == 0: return text
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        parts = list()
+        last = 0
+        for start, end, i in matches:
+            if start < last: continue
+            parts.append(text[last:start])
+            parts.append(replacements[i])
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts)
+
+class SubstitutionRuleset(BaseRuleset):
+
+    """
+    ### 全局文本替换规则集
+    不声明ID，在所有ID规则集之后改写每一条输出文本(参见 BaseRuleset.rewrite)
+    数据目录中的`.txt`文件每行为`原文=替换为`，支持以`#`开头的注释，
+    所有模式编译成一个自动机(参见 AhoCorasick)，重叠时取最左最长的匹配
+    `normalize_whitespace`为真时模式和文本中连续的空白都视为一个空格，首尾空白被去掉
+    """
+
+    rewrites_text = True
+
+    def __init__(self, ruleset_folder: str, normalize_whitespace: bool = False) -> None:
+        super().__init__()
+        self.ruleset_folder = ruleset_folder
+        self.normalize_whitespace = normalize_whitespace
+        self.data: dict[str, str] = dict()
+        for filename in sorted(os.listdir(ruleset_folder)):
+            full_path = os.path.join(ruleset_folder, filename)
+            if not filename.endswith('.txt') or os.path.isdir(full_path): continue
+            with open(full_path, 'r', encoding=config.ENCODE, errors='replace') as file:
+                logging.info(f"Reading {full_path}")
+                for line in iter_file_lines(file):
+                    src, p, dst = line.partition('=')
+                    if src.startswith('#') or p != '=': continue
+                    if normalize_whitespace:
+                        src = normalize_spaces(src)
+                    if len(src) == 0: continue
+                    self.data[src] = dst
+        self.replacements = list(self.data.values())
+        self.automaton = AhoCorasick(list(self.data.keys()))
+        logging.info(f"{type(self).__name__} compiled {len(self.data)} patterns")
+
+    def get_sources(self) -> list[str]:
+        return [self.ruleset_folder]
+
+    def rewrite(self, text: str) -> str:
+        if self.normalize_whitespace:
+            text = normalize_spaces(text)
+        return self.automaton.replace(text, self.replacements)
+
+    def translate(self, tid: str|tuple, cn_str: str|None, en_str: str|None) -> str:
+        raise KeyError('文本替换规则集不生成ID')
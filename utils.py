@@ -3,11 +3,37 @@ import logging
 import config
 
 from io import TextIOWrapper
+from typing import Iterator
+from text_encoding import DecodeIssue, iter_decoded_lines
+
+def iter_file_lines(file: TextIOWrapper) -> Iterator[str]:
+    """逐行读取文件(不含换行符)，不会把整个文件读进内存"""
+    for line in file:
+        line = line.removesuffix('\n')
+        if config.UNKNOWN_CHR in line:
+            line = line.replace(config.UNKNOWN_CHR, config.REPLACE_CHR)
+        yield line
+
+def iter_ini_items(file: TextIOWrapper) -> Iterator[tuple[str, str]]:
+    """逐行解析ini文件，产出`(tid, text)`"""
+    for line in iter_file_lines(file):
+        tid, _, text = line.partition('=')
+        yield tid.removeprefix('\ufeff'), text
+
+def iter_ini_file(
+    path: str, 
+    encoding: str|None = config.TEXT_ENCODING, 
+    issues: list[DecodeIssue]|None = None
+) -> Iterator[tuple[str, str]]:
+    """按检测到的编码流式解析ini文件，产出`(tid, text)`，无法解码的字节会报告位置"""
+    for line in iter_decoded_lines(path, encoding, issues):
+        if config.UNKNOWN_CHR in line:
+            line = line.replace(config.UNKNOWN_CHR, config.REPLACE_CHR)
+        tid, _, text = line.partition('=')
+        yield tid.removeprefix('\ufeff'), text
 
 def read_file_lines(file: TextIOWrapper) -> list[str]:
-    content = file.read().replace(config.UNKNOWN_CHR, config.REPLACE_CHR)
-    lines = content.splitlines()
-    return lines
+    return list(iter_file_lines(file))
 
 class TextReader():
     
@@ -20,18 +46,14 @@ class TextReader():
         self.id_set  = set()
         self.en_dict = dict()
         self.cn_dict = dict()
-        with open(os.path.join(base_path, en_file), 'r', encoding=config.ENCODE, errors='replace') as file:
-            logging.info(f"Reading {os.path.join(base_path, en_file)}")
-            for line in read_file_lines(file):
-                tid, _, text = line.partition('=')
-                self.id_set.add(tid)
-                self.en_dict[tid] = text
-        with open(os.path.join(base_path, cn_file), 'r', encoding=config.ENCODE, errors='replace') as file:
-            logging.info(f"Reading {os.path.join(base_path, cn_file)}")
-            for line in read_file_lines(file):
-                tid, _, text = line.partition('=')
-                self.id_set.add(tid)
-                self.cn_dict[tid] = text
+        logging.info(f"Reading {os.path.join(base_path, en_file)}")
+        for tid, text in iter_ini_file(os.path.join(base_path, en_file)):
+            self.id_set.add(tid)
+            self.en_dict[tid] = text
+        logging.info(f"Reading {os.path.join(base_path, cn_file)}")
+        for tid, text in iter_ini_file(os.path.join(base_path, cn_file)):
+            self.id_set.add(tid)
+            self.cn_dict[tid] = text
     
     def get(self, tid):
         if tid not in self.id_set: return None
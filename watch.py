@@ -0,0 +1,82 @@
+import os, time
+import logging
+
+import config
+from generation_manager import GenerationManager
+from output_writer import OutputVariant
+
+def scan_source(path: str) -> dict[str, tuple[int, int]]:
+    """返回路径下所有文件的`{文件: (修改时间, 大小)}`，目录只扫描一层"""
+    state = dict()
+    try:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+    except OSError as e:
+        logging.warning(f"[WATCH_EXECPTION] {e}")
+    return state
+
+class SourceWatcher():
+
+    """
+    轮询数据文件和目录的变化
+
+    只比较修改时间和大小，每次轮询只需要stat被监视的文件
+    """
+
+    def __init__(self, paths) -> None:
+        self.paths = list(paths)
+        self.state = {path: scan_source(path) for path in self.paths}
+
+    def poll(self) -> list[str]:
+        """返回内容有变化(包括新增/删除文件)的被监视路径"""
+        changed = list()
+        for path in self.paths:
+            state = scan_source(path)
+            if state != self.state[path]:
+                self.state[path] = state
+                changed.append(path)
+        return changed
+
+def watch(
+    manager: GenerationManager,
+    variants: list[OutputVariant],
+    interval: float = config.WATCH_INTERVAL
+):
+    """
+    常驻模式，需要先应用过规则集，启动时会先完整生成一次输出
+
+    文本数据、规则集实例和API数据都保留在内存中，
+    规则集的数据文件(参见 BaseRuleset.get_sources)变化时只重建对应的规则集并重新生成输出
+    """
+    manager.keep_rendered = True
+    manager.generate_variants(variants)
+    sources = dict()
+    for ruleset in manager.rulesets:
+        for path in ruleset.get_sources():
+            sources.setdefault(os.path.normpath(path), set()).add(type(ruleset).__name__)
+    watcher = SourceWatcher(sources.keys())
+    logging.info(f"Watching {', '.join(sources.keys())}, press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(interval)
+            changed = watcher.poll()
+            if len(changed) == 0: continue
+            names = set().union(*(sources[path] for path in changed))
+            start = time.perf_counter()
+            try:
+                changed_ids = manager.rebuild_rulesets(names)
+                manager.generate_variants(variants, changed_ids)
+            except Exception as e:
+                # 文件可能正在编辑中，保持运行等待下一次修改
+                logging.exception(f"[WATCH_EXECPTION] 重建{', '.join(sorted(names))}失败: {e}")
+                continue
+            logging.info(f"Rebuilt {', '.join(sorted(names))} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    except KeyboardInterrupt:
+        logging.info('Watch stopped')